@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from core.models import BulkResearch, SingleResearch, ClaimResearch, Influencer, Claim, ResearchPaper
+from core.models import BulkResearch, SingleResearch, ClaimResearch, Influencer, Claim, ResearchPaper, Category, PerplexityResponse, ResearchEvent, CanonicalClaim, InfluencerAlias
 
 
 admin.site.site_header = 'Veriwell Admin'
@@ -14,4 +14,9 @@ admin.site.register(SingleResearch)
 admin.site.register(ClaimResearch)
 admin.site.register(Influencer)
 admin.site.register(Claim)
-admin.site.register(ResearchPaper)
\ No newline at end of file
+admin.site.register(ResearchPaper)
+admin.site.register(Category)
+admin.site.register(PerplexityResponse)
+admin.site.register(ResearchEvent)
+admin.site.register(CanonicalClaim)
+admin.site.register(InfluencerAlias)
@@ -0,0 +1,67 @@
+import functools
+import typing
+
+import pydantic_core
+from pydantic import TypeAdapter, ValidationError
+
+
+ANY_JSON = TypeAdapter(typing.Any)
+
+
+def message_content(body):
+    """
+    Content of the first choice of a chat completion response body (bytes)
+    """
+    return pydantic_core.from_json(body)['choices'][0]['message']['content']
+
+
+def json_span(content):
+    """
+    The JSON document inside the model content, without surrounding prose or ``` fences
+    """
+    starts = [index for index in (content.find('{'), content.find('[')) if index != -1]
+    if not starts:
+        raise ValueError('No JSON in the answer')
+    return content[min(starts):max(content.rfind('}'), content.rfind(']')) + 1]
+
+
+@functools.lru_cache(maxsize=None)
+def answer_adapters(answer_format):
+    """
+    Name of the single field of an answer format, and validators of the answer format and of the
+    field alone (models often answer with the bare list or object the prompt describes rather than
+    the wrapping schema)
+    """
+    name, field = next(iter(answer_format.model_fields.items()))
+    return name, TypeAdapter(answer_format), TypeAdapter(field.annotation)
+
+
+def validate_json(adapter, span):
+    try:
+        return adapter.validate_json(span)
+    except ValidationError as e:
+        if not any(error['type'] == 'json_invalid' for error in e.errors()):
+            raise
+        # raw line breaks inside strings
+        return adapter.validate_json(span.replace('\n', ' '))
+
+
+def parse_answer(content, answer_format=None):
+    """
+    Parse the JSON of the model content and, given the flow's `AnswerFormat`, validate it and
+    return the value of its field. Parsing and validation are a single pass of pydantic-core.
+
+    Raises:
+        ValueError: the content holds no valid JSON or it does not match the answer format
+    """
+    span = json_span(content)
+    if answer_format is None:
+        return validate_json(ANY_JSON, span)
+
+    name, adapter, field_adapter = answer_adapters(answer_format)
+    if span.startswith('['):
+        return validate_json(field_adapter, span)
+    try:
+        return getattr(validate_json(adapter, span), name)
+    except ValidationError:
+        return validate_json(field_adapter, span)
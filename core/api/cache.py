@@ -0,0 +1,86 @@
+import hashlib
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.api.conditional import conditional_response, etag_for
+from core.models import CacheVersion
+
+
+CACHE_ALIAS = 'api'
+
+# groups of data the cached responses depend on, each with its own version
+CATALOG = 'catalog'  # influencers, claims and research papers
+RESEARCH = 'research'  # research runs
+CATEGORIES = 'categories'  # the category catalogue (`core.catalogue`)
+
+
+def bump(*scopes):
+    """
+    Increment the version of the scopes, orphaning the responses cached under the previous one
+    """
+    for scope in scopes:
+        if CacheVersion.objects.filter(scope=scope).update(version=F('version') + 1, updated_at=timezone.now()):
+            continue
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(scope=scope, version=1)
+        except IntegrityError:
+            CacheVersion.objects.filter(scope=scope).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def invalidate(*scopes):
+    """
+    Invalidate the responses depending on the scopes once the current transaction commits.
+
+    Versions live in the database rather than in the cache, so writes made by the research
+    workers invalidate the responses cached by every web process, whatever the cache backend.
+    """
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def scope_version(scope):
+    """
+    Current version of the scope and when it was bumped (None if it never was)
+    """
+    return CacheVersion.objects.filter(scope=scope).values_list('version', 'updated_at').first() or (0, None)
+
+
+class CachedResponseMixin:
+    """
+    Serve `list` and `retrieve` from the API response cache (`CACHES['api']`) with an ETag,
+    answering 304 to clients whose copy is current.
+
+    Responses are keyed by host, path, query parameters and the versions of the `cache_scopes` they
+    depend on, so a hit costs one small query instead of the view's queries and serialization.
+    """
+    cache_scopes = (CATALOG,)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cache_key(self, request):
+        versions = dict(CacheVersion.objects.filter(scope__in=self.cache_scopes).values_list('scope', 'version'))
+        query = sorted(request.query_params.lists())
+        # the host and scheme too: paginated responses embed absolute links
+        key = repr((request.scheme, request.get_host(), request.path, query, [versions.get(scope, 0) for scope in self.cache_scopes]))
+        return 'response:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def cached_response(self, request, view, *args, **kwargs):
+        cache = caches[CACHE_ALIAS]
+        key = self.cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            resp = view(request, *args, **kwargs)
+            if resp.status_code != 200:
+                return resp
+            cached = (etag_for(resp.data), resp.data)
+            cache.set(key, cached)
+
+        etag, data = cached
+        return conditional_response(request, data, etag=etag)
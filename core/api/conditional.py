@@ -0,0 +1,34 @@
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import response
+
+
+def etag_for(data):
+    """
+    Strong ETag of JSON-serializable response data
+    """
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return quote_etag(hashlib.sha1(payload.encode()).hexdigest())
+
+
+def conditional_response(request, data, last_modified=None, etag=None):
+    """
+    Answer with the data and its validators (ETag, Last-Modified), or 304 if the client's copy is current
+
+    Args:
+        request: the DRF request
+        data: JSON-serializable response data
+        last_modified: datetime of the last change of the data, if known
+        etag: ETag of the data, if already computed
+    """
+    etag = etag or etag_for(data)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    resp = not_modified or response.Response(data)
+    resp.headers['ETag'] = etag
+    if timestamp is not None:
+        resp.headers['Last-Modified'] = http_date(timestamp)
+    return resp
@@ -0,0 +1,125 @@
+import base64
+import json
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ClaimCursorPagination(BasePagination):
+    """
+    Keyset pagination of the claims feed, ordered by the `sort_by` query parameter (`date`,
+    `trust_score`, optionally prefixed with `-`) then by id, claims without a value last.
+
+    The cursor holds the (value, id) of the last claim of the page, and the next page is the claims
+    after it in that order, so pages never repeat or skip claims however many share a value.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    sort_fields = ('date', 'trust_score')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_sort(self, request):
+        """
+        The sort field (None to sort by id only) and whether it is descending
+        """
+        sort_by = request.query_params.get('sort_by') or ''
+        field = sort_by.lstrip('-')
+        return (field if field in self.sort_fields else None), sort_by.startswith('-')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk, forward = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return value, int(pk), bool(forward)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, claim, forward):
+        value = getattr(claim, self.field) if self.field else None
+        if value is not None and not isinstance(value, (int, float)):
+            value = value.isoformat()
+        cursor = base64.urlsafe_b64encode(json.dumps([value, claim.pk, forward]).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def keyset_filter(self, value, pk, forward):
+        """
+        Claims after (`forward`) or before the claim (value, pk) in the feed order
+        """
+        later, earlier = ('lt', 'gt') if self.descending else ('gt', 'lt')
+        op = later if forward else earlier
+        if self.field is None:
+            return Q(**{f'id__{op}': pk})
+
+        null = Q(**{f'{self.field}__isnull': True})
+        if value is None:
+            # claims without a value come last, in id order
+            return null & Q(**{f'id__{op}': pk}) if forward else ~null | (null & Q(**{f'id__{op}': pk}))
+        keyset = Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+        return keyset | null if forward else keyset
+
+    def get_ordering(self, forward):
+        """
+        The feed order, or the reverse one (claims without a value first) to walk it backwards
+        """
+        descending = self.descending == forward
+        if self.field is None:
+            return ['-id' if descending else 'id']
+        nulls = {'nulls_last': True} if forward else {'nulls_first': True}
+        field = F(self.field).desc(**nulls) if descending else F(self.field).asc(**nulls)
+        return [field, '-id' if descending else 'id']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_sort(request)
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        forward = cursor is None or cursor[2]
+
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(cursor[0], cursor[1], forward))
+        page = list(queryset.order_by(*self.get_ordering(forward))[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if not forward:
+            page.reverse()
+
+        self.next_url = self.previous_url = None
+        if page:
+            if has_more or not forward:
+                self.next_url = self.encode_cursor(page[-1], forward=True)
+            if cursor is not None and (forward or has_more):
+                self.previous_url = self.encode_cursor(page[0], forward=False)
+        elif cursor is not None:
+            self.previous_url = remove_query_param(self.base_url, self.cursor_query_param)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_url,
+            'previous': self.previous_url,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
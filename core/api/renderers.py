@@ -0,0 +1,30 @@
+import orjson
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson; types orjson does not know (Decimal, lazy strings, querysets...)
+    go through DRF's encoder
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = orjson.OPT_NON_STR_KEYS
+        # the browsable API asks for indented JSON
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=JSONEncoder().default, option=option)
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        if accepted_media_type:
+            base_media_type, params = parse_header_parameters(accepted_media_type)
+            if params.get('indent'):
+                return True
+        return bool(renderer_context.get('indent'))
@@ -1,5 +1,19 @@
 from rest_framework import serializers
-from core.models import Influencer, Claim, BulkResearch, SingleResearch, ClaimResearch
+from core.models import Influencer, Claim, ResearchPaper, BulkResearch, SingleResearch, ClaimResearch
+
+
+class SparseFieldsMixin:
+    """
+    Limits the serialized fields to those listed in the comma separated `fields` query parameter
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request else None
+        if fields:
+            requested = set(fields.split(','))
+            for field_name in set(self.fields) - requested:
+                self.fields.pop(field_name)
 
 class InfluencerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,6 +24,9 @@ class InfluencerSerializer(serializers.ModelSerializer):
     followers = serializers.SerializerMethodField()
 
     def get_verified_claims(self, obj):
+        # annotated by InfluencersViewSet.get_queryset; instances built elsewhere fall back to a query
+        if hasattr(obj, 'verified_claims_count'):
+            return obj.verified_claims_count
         return obj.claims.count()
 
     def get_followers(self, obj):
@@ -24,31 +41,57 @@ class InfluencerSerializer(serializers.ModelSerializer):
             return obj.followers
 
 
-class ClaimSerializer(serializers.ModelSerializer):
+# nested representations list their public fields, so bookkeeping columns (running aggregates,
+# normalized names, canonical links...) never leak into the API
+
+class NestedInfluencerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Influencer
+        fields = ['id', 'name', 'profile_picture', 'bio', 'category', 'followers', 'trust_score']
+        read_only_fields = fields
+
+
+class NestedResearchPaperSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ResearchPaper
+        fields = ['id', 'title', 'link', 'journal', 'date']
+        read_only_fields = fields
+
+
+class ClaimSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    influencer = NestedInfluencerSerializer(read_only=True)
+    evidence = NestedResearchPaperSerializer(many=True, read_only=True)
+    counter_evidence = NestedResearchPaperSerializer(many=True, read_only=True)
+
     class Meta:
         model = Claim
         fields = ['id', 'influencer', 'claim', 'source', 'category', 'date', 'trust_score', 'status', 'evidence', 'counter_evidence']
-        depth = 1
 
 
 class BulkResearchSerializer(serializers.ModelSerializer):
+    influencers = NestedInfluencerSerializer(many=True, read_only=True)
+
     class Meta:
         model = BulkResearch
-        fields = ['id', 'influencers', 'failed', 'created_at', 'updated_at']
-        depth = 1
+        fields = ['id', 'influencers', 'failed', 'status', 'progress', 'stage', 'error', 'result', 'queued_at', 'started_at', 'finished_at', 'created_at', 'updated_at']
+        read_only_fields = ['status', 'progress', 'stage', 'error', 'result', 'queued_at', 'started_at', 'finished_at']
 
 
 class SingleResearchSerializer(serializers.ModelSerializer):
+    influencer = NestedInfluencerSerializer(read_only=True)
+
     class Meta:
         model = SingleResearch
-        fields = ['id', 'influencer', 'failed', 'created_at', 'updated_at']
-        depth = 1
+        fields = ['id', 'influencer', 'failed', 'status', 'progress', 'stage', 'error', 'result', 'queued_at', 'started_at', 'finished_at', 'created_at', 'updated_at']
+        read_only_fields = ['status', 'progress', 'stage', 'error', 'result', 'queued_at', 'started_at', 'finished_at']
 
 
 class ClaimResearchSerializer(serializers.ModelSerializer):
+    claim = ClaimSerializer(read_only=True)
+
     class Meta:
         model = ClaimResearch
-        fields = ['id', 'claim', 'failed', 'created_at', 'updated_at']
-        depth = 2
+        fields = ['id', 'claim', 'failed', 'status', 'progress', 'stage', 'error', 'result', 'queued_at', 'started_at', 'finished_at', 'created_at', 'updated_at']
+        read_only_fields = ['status', 'progress', 'stage', 'error', 'result', 'queued_at', 'started_at', 'finished_at']
 
 
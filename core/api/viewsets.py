@@ -1,30 +1,53 @@
-from datetime import datetime
 
+from django.db.models import Count, Q
+from django.utils.http import quote_etag
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework import response
+from core.api.cache import CATALOG, CATEGORIES, RESEARCH, CachedResponseMixin, scope_version
+from core.api.conditional import conditional_response
+from core.api.pagination import ClaimCursorPagination
 from core.api.serializers import InfluencerSerializer, ClaimSerializer, BulkResearchSerializer, SingleResearchSerializer, ClaimResearchSerializer
 
-from core.flows import InfluencerFlow, InfluencersFlow, HealthClaimsFlow, SingleClaimFlow
-from core.models import BulkResearch, SingleResearch, ClaimResearch, Influencer, Claim, ResearchPaper
-from core.utils import are_strings_similar
+from core.jobs import enqueue
+from core.search import search_claims
+from core.models import BulkResearch, SingleResearch, ClaimResearch, ResearchStatus, Influencer, Claim, Category, CategoryKind
 
-from django.conf import settings
 
+def category_catalogue_response(request, kind):
+    """
+    Categories of the catalogue (with their counts if `counts=true`), revalidated via ETag/Last-Modified.
 
-DEFAULT_PERPLEXITY_KEY = settings.PERPLEXITY_API_KEY
+    Both validators come from the version of the catalogue, bumped by every change including a removed
+    category (the categories' own `updated_at` cannot show a deletion).
+    """
+    counts = request.query_params.get('counts') in ('1', 'true', 'True')
+    version, last_modified = scope_version(CATEGORIES)
+    etag = quote_etag(f'{CATEGORIES}-{version}-{kind}{"-counts" if counts else ""}')
 
+    categories = Category.objects.filter(kind=kind, count__gt=0).order_by('name')
+    # the uncategorized rows (name '') are listed as null
+    if counts:
+        data = [{'category': name or None, 'count': count} for name, count in categories.values_list('name', 'count')]
+    else:
+        data = [name or None for name in categories.values_list('name', flat=True)]
+    return conditional_response(request, data, last_modified, etag=etag)
 
-class InfluencersViewSet(viewsets.ModelViewSet):
+
+class InfluencersViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = InfluencerSerializer
 
     def get_queryset(self):
-        queryset = Influencer.objects.all()
         influencer_name = self.request.query_params.get('influencer_name')
         category = self.request.query_params.get('category')
+        verified_only = self.request.query_params.get('verified_only') in ('1', 'true', 'True')
+
+        # count claims in the main query instead of once per serialized influencer
+        claims_filter = Q(claims__status='verified') if verified_only else None
+        queryset = Influencer.objects.annotate(verified_claims_count=Count('claims', filter=claims_filter))
 
         if influencer_name:
-            queryset = queryset.filter(influencer__name=influencer_name)
+            queryset = queryset.filter(name=influencer_name)
         if category:
             queryset = queryset.filter(category__icontains=category)
 
@@ -39,291 +62,6 @@ class InfluencersViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
-    @action(detail=False, methods=['post'])
-    def check_bulk(self, request):
-        key = request.query_params.get('key', DEFAULT_PERPLEXITY_KEY)
-        model = request.query_params.get('model', 'sonar')
-        journals = request.query_params.get('journals')
-        comment = request.query_params.get('comment')
-        count = request.query_params.get('count', 5)
-        do_not_repeat = request.query_params.get('do_not_repeat')
-        research = request.query_params.get('research')
-        timeframe = request.query_params.get('timeframe', 'latest')
-
-        if not research:
-            return response.Response(data={'error': 'Research ID is required'}, status=400)
-
-        try:
-            research = BulkResearch.objects.get(id=research)
-        except BulkResearch.DoesNotExist:
-            return response.Response(data={'error': 'Research ID is invalid'}, status=400)
-
-        # retrieve new influencers
-        flow = InfluencersFlow(key, model=model, count=count, do_not_repeat=do_not_repeat)
-        resp = flow.discover_influencers()
-
-        if isinstance(resp, response.Response):
-            research.failed = True
-            research.save()
-            return resp
-
-        # retrieve health claims
-        for influencer in resp:
-            health_flow = HealthClaimsFlow(key, influencer, journals, comment, model=model, timeframe=timeframe)
-            health_resp = health_flow.discover_health_claims()
-            if isinstance(health_resp, response.Response):
-                research.failed = True
-                research.save()
-                return health_resp
-            influencer['health_claims'] = health_resp
-            ## overall trust score of influencer (avg)
-            influencer['trust_score'] = round(sum([claim['trust_score'] for claim in health_resp]) / len(health_resp), 2)
-
-        # save influencers to research
-        for influencer in resp:
-            influencer_obj = Influencer.objects.filter(name=influencer.get('name'))
-            if influencer_obj:
-                influencer_obj = influencer_obj.first()
-            if not influencer_obj:
-                influencer_obj = Influencer.objects.create(
-                    name=influencer.get('name'),
-                    bio=influencer.get('bio'),
-                    followers=influencer.get('followers'),
-                    trust_score=influencer.get('trust_score'),
-                    profile_picture=influencer.get('profile_picture'),
-                    category=influencer.get('category')
-                )
-            research.influencers.add(influencer_obj)
-
-            for claim in influencer.get('health_claims'):
-                # Check for duplicate claims using Levenshtein distance
-                existing_claims = Claim.objects.filter(influencer=influencer_obj)
-                is_duplicate = False
-                for existing_claim in existing_claims:
-                    if are_strings_similar(claim.get('claim'), existing_claim.claim):
-                        is_duplicate = True
-                        break
-
-                if is_duplicate:
-                    continue
-
-                try:
-                    # Validate date format
-                    if claim.get('date') and claim.get('date') != "Undated":
-                        datetime.strptime(claim.get('date'), '%Y-%m-%d')
-                except ValueError:
-                    claim['date'] = None
-
-                claim_obj = Claim.objects.create(influencer=influencer_obj, claim=claim.get('claim'), source=claim.get('source'), category=claim.get('category'), date=claim.get('date'), trust_score=claim.get('trust_score'), status=claim.get('status'))
-                research_papers = claim.get('research_papers')
-                for paper in research_papers:
-                    date = paper.get('date')
-                    try:
-                        # Validate date format
-                        if date and date != "Undated":
-                            datetime.strptime(date, '%Y-%m-%d')
-                        else:
-                            date = None
-                    except ValueError:
-                        date = None
-                    link = paper.get('link')
-                    if link:
-                        evidence_obj = ResearchPaper.objects.create(title=paper.get('title'), link=paper.get('link'), journal=paper.get('journal'), date=date)
-                        if paper.get('is_evidence'):
-                            claim_obj.evidence.add(evidence_obj)
-                        else:
-                            claim_obj.counter_evidence.add(evidence_obj)
-
-            # Update influencer trust score
-            all_claims = Claim.objects.filter(influencer=influencer_obj)
-            if all_claims.exists():
-                avg_trust_score = round(sum([claim.trust_score for claim in all_claims]) / len(all_claims), 2)
-                influencer_obj.trust_score = avg_trust_score
-                influencer_obj.save()
-
-        return response.Response(data=resp)
-
-    @action(detail=False, methods=['post'])
-    def check_influencer(self, request):
-        key = request.query_params.get('key', DEFAULT_PERPLEXITY_KEY)
-        model = request.query_params.get('model', 'sonar')
-        influencer = request.query_params.get('influencer')
-        count = request.query_params.get('count', 5)
-        research_id = request.query_params.get('research')
-        journals = request.query_params.get('journals')
-        comment = request.query_params.get('comment')
-        timeframe = request.query_params.get('timeframe', 'latest')
-
-        if not research_id:
-            return response.Response(data={'error': 'Research ID is required'}, status=400)
-
-        try:
-            research = SingleResearch.objects.get(id=research_id)
-        except SingleResearch.DoesNotExist:
-            return response.Response(data={'error': 'Research ID is invalid'}, status=400)
-
-        # retrieve influencer
-        flow = InfluencerFlow(key, influencer, model=model)
-        resp = flow.check_influencer()
-
-        if isinstance(resp, response.Response):
-            research.failed = True
-            research.save()
-            return resp
-
-        # retrieve health claims
-        health_flow = HealthClaimsFlow(key, influencer, journals=journals, comment=comment, count=count, model=model, timeframe=timeframe)
-        health_resp = health_flow.discover_health_claims()
-        if isinstance(health_resp, response.Response):
-            research.failed = True
-            research.save()
-            return health_resp
-        resp['health_claims'] = health_resp
-        ## overall trust score of influencer (avg)
-        resp['trust_score'] = round(sum([claim['trust_score'] for claim in health_resp]) / len(health_resp), 2)
-
-        # save influencer to research
-        influencer_obj = Influencer.objects.filter(name=resp.get('name'))
-        if influencer_obj:
-            influencer_obj = influencer_obj.first()
-        if not influencer_obj:
-            influencer_obj = Influencer.objects.create(
-                name=resp.get('name'),
-                bio=resp.get('bio'),
-                followers=resp.get('followers'),
-                trust_score=resp.get('trust_score'),
-                profile_picture=resp.get('profile_picture'),
-                category = resp.get('category')
-            )
-        research.influencer = influencer_obj
-        research.save()
-
-        for claim in resp.get('health_claims'):
-            # Check for duplicate claims using Levenshtein distance
-            existing_claims = Claim.objects.filter(influencer=influencer_obj)
-            is_duplicate = False
-            for existing_claim in existing_claims:
-                if are_strings_similar(claim.get('claim'), existing_claim.claim):
-                    is_duplicate = True
-                    break
-
-            if is_duplicate:
-                continue
-
-            try:
-                # Validate date format
-                if claim.get('date') and claim.get('date') != "Undated":
-                    datetime.strptime(claim.get('date'), '%Y-%m-%d')
-            except ValueError:
-                claim['date'] = None
-
-            claim_obj = Claim.objects.create(influencer=influencer_obj, claim=claim.get('claim'), source=claim.get('source'), category=claim.get('category'), date=claim.get('date'), trust_score=claim.get('trust_score'), status=claim.get('status'))
-            research_papers = claim.get('research_papers')
-            for paper in research_papers:
-                date = paper.get('date')
-                try:
-                    # Validate date format
-                    if date and date != "Undated":
-                        datetime.strptime(date, '%Y-%m-%d')
-                    else:
-                        date = None
-                except ValueError:
-                    date = None
-                link = paper.get('link')
-                if link:
-                    evidence_obj = ResearchPaper.objects.create(title=paper.get('title'), link=paper.get('link'), journal=paper.get('journal'), date=date)
-                    if paper.get('is_evidence'):
-                        claim_obj.evidence.add(evidence_obj)
-                    else:
-                        claim_obj.counter_evidence.add(evidence_obj)
-
-        # Update influencer trust score
-        all_claims = Claim.objects.filter(influencer=influencer_obj)
-        if all_claims.exists():
-            avg_trust_score = round(sum([claim.trust_score for claim in all_claims]) / len(all_claims), 2)
-            influencer_obj.trust_score = avg_trust_score
-            influencer_obj.save()
-
-        return response.Response(data=resp)
-
-    @action(detail=False, methods=['post'])
-    def check_claim(self, request):
-        key = request.query_params.get('key', DEFAULT_PERPLEXITY_KEY)
-        model = request.query_params.get('model', 'sonar')
-        claim = request.query_params.get('claim')
-        journals = request.query_params.get('journals')
-        research_id = request.query_params.get('research')
-
-        if not research_id:
-            return response.Response(data={'error': 'Research ID is required'}, status=400)
-
-        try:
-            research = ClaimResearch.objects.get(id=research_id)
-        except ClaimResearch.DoesNotExist:
-            return response.Response(data={'error': 'Research ID is invalid'}, status=400)
-
-
-        # validate the claim
-        flow = SingleClaimFlow(key, claim, journals, model=model)
-        validation_result = flow.validate_claim()
-
-        if isinstance(validation_result, response.Response):
-            research.failed = True
-            research.save()
-            return validation_result
-
-        # Create or get the Default influencer
-        default_influencer, created = Influencer.objects.get_or_create(name="Default")
-
-        # Ensure link is not null before creating ResearchPaper objects
-        research_papers = []
-        evidence_list = []
-        counter_evidence_list = []
-        for paper in validation_result.get('research_papers', []):
-            date = paper.get('date')
-            try:
-                # Validate date format
-                if date and date != "Undated":
-                    datetime.strptime(date, '%Y-%m-%d')
-                else:
-                    date = None
-            except ValueError:
-                date = None
-            link = paper.get('link')
-            if link:
-                evidence_obj = ResearchPaper.objects.create(title=paper.get('title'), link=link, journal=paper.get('journal'), date=date)
-                research_papers.append({
-                    'title': evidence_obj.title,
-                    'link': evidence_obj.link,
-                    'journal': evidence_obj.journal,
-                    'date': evidence_obj.date
-                })
-                if paper.get('is_evidence'):
-                    evidence_list.append(evidence_obj)
-                else:
-                    counter_evidence_list.append(evidence_obj)
-
-        # Create the claim and associate it with the Default influencer
-        claim_obj = Claim.objects.create(
-            influencer=default_influencer,
-            claim=validation_result.get('claim'),
-            category=validation_result.get('category'),
-            date=datetime.now(),
-            trust_score=validation_result.get('trust_score'),
-            status=validation_result.get('status')
-        )
-        claim_obj.evidence.set(evidence_list)
-        claim_obj.counter_evidence.set(counter_evidence_list)
-
-        # Update validation_result with serializable research papers
-        validation_result['research_papers'] = research_papers
-
-        # Create and associate ClaimResearch with the claim
-        research.claim = claim_obj
-        research.save()
-
-        return response.Response(status=200, data={'success': 'Claim checked successfully'})
-
     @action(detail=False, methods=['post'])
     def begin_research(self, request):
         research_type = request.query_params.get('research_type')
@@ -344,28 +82,33 @@ class InfluencersViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def categories(self, request):
-        categories = Influencer.objects.values_list('category', flat=True).distinct()
-        return response.Response(categories)
+        return category_catalogue_response(request, CategoryKind.INFLUENCER)
 
 
-class ClaimsViewSet(viewsets.ModelViewSet):
+class ClaimsViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = ClaimSerializer
+    pagination_class = ClaimCursorPagination
 
     def get_queryset(self):
         influencer_name = self.request.query_params.get('influencer_name')
         category = self.request.query_params.get('category')
-        sort_by = self.request.query_params.get('sort_by')
+        fields = self.request.query_params.get('fields')
+        fields = set(fields.split(',')) if fields else None
 
         queryset = Claim.objects.all()
 
+        # load the nested relations of a page in a fixed number of queries
+        if fields is None or 'influencer' in fields:
+            queryset = queryset.select_related('influencer')
+        queryset = queryset.prefetch_related(*[
+            relation for relation in ('evidence', 'counter_evidence') if fields is None or relation in fields
+        ])
+
         if influencer_name:
             queryset = queryset.filter(influencer__name=influencer_name)
         if category:
             queryset = queryset.filter(category__icontains=category)
 
-        if sort_by in ['date', 'trust_score']:
-            queryset = queryset.order_by(sort_by)
-
         return queryset
 
     def list(self, request, *args, **kwargs):
@@ -376,11 +119,46 @@ class ClaimsViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def categories(self, request):
-        categories = Claim.objects.values_list('category', flat=True).distinct()
-        return response.Response(categories)
-
+        return category_catalogue_response(request, CategoryKind.CLAIM)
 
-class BulkResearchViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return response.Response(data={'error': 'Search query is required'}, status=400)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return response.Response(data={'error': 'Limit must be a number'}, status=400)
+
+        claims = search_claims(query, limit=limit)
+        results = []
+        for claim, data in zip(claims, self.get_serializer(claims, many=True).data):
+            data['rank'] = claim.rank
+            data['headline'] = claim.headline
+            results.append(data)
+        return response.Response(results)
+
+
+class ResumeResearchMixin:
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """
+        Queue the research again with its last parameters, redoing only the stages its last run did not complete
+        """
+        research = self.get_object()
+        if research.status in (ResearchStatus.QUEUED, ResearchStatus.RUNNING):
+            return response.Response(data={'error': 'Research is already in progress'}, status=409)
+        if research.status == ResearchStatus.PENDING:
+            return response.Response(data={'error': 'Research has not been run yet'}, status=400)
+
+        enqueue(research, research.params, resume=True)
+        return response.Response(data={'research_id': research.id, 'status': research.status}, status=202)
+
+
+class BulkResearchViewSet(ResumeResearchMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    # nests the influencers and claims of the research
+    cache_scopes = (RESEARCH, CATALOG)
     serializer_class = BulkResearchSerializer
 
     def get_queryset(self):
@@ -390,7 +168,9 @@ class BulkResearchViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class SingleResearchViewSet(viewsets.ModelViewSet):
+class SingleResearchViewSet(ResumeResearchMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    # nests the influencers and claims of the research
+    cache_scopes = (RESEARCH, CATALOG)
     serializer_class = SingleResearchSerializer
 
     def get_queryset(self):
@@ -400,7 +180,9 @@ class SingleResearchViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class ClaimResearchViewSet(viewsets.ModelViewSet):
+class ClaimResearchViewSet(ResumeResearchMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    # nests the influencers and claims of the research
+    cache_scopes = (RESEARCH, CATALOG)
     serializer_class = ClaimResearchSerializer
 
     def get_queryset(self):
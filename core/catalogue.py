@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core.api.cache import CATEGORIES, invalidate
+from core.models import Category, CategoryKind, Claim, Influencer
+
+
+SOURCES = {
+    CategoryKind.INFLUENCER: Influencer,
+    CategoryKind.CLAIM: Claim,
+}
+
+
+@transaction.atomic
+def refresh_categories(kind):
+    """
+    Recount the categories of one kind from its source table, touching only the rows that changed
+    """
+    counts = {}
+    for name, count in SOURCES[kind].objects.order_by().values_list('category').annotate(count=Count('id')):
+        counts[name or ''] = counts.get(name or '', 0) + count
+    current = {category.name: category for category in Category.objects.select_for_update().filter(kind=kind)}
+
+    added = [Category(kind=kind, name=name, count=count) for name, count in counts.items() if name not in current]
+    Category.objects.bulk_create(added)
+
+    changed = [category for name, category in current.items() if name in counts and category.count != counts[name]]
+    for category in changed:
+        category.count = counts[category.name]
+        category.save(update_fields=['count', 'updated_at'])
+
+    removed = [category.pk for name, category in current.items() if name not in counts]
+    if removed:
+        Category.objects.filter(pk__in=removed).delete()
+
+    if added or changed or removed:
+        invalidate(CATEGORIES)
+
+
+def add_categories(kind, names):
+    """
+    Count newly inserted rows of one kind (e.g. after a `bulk_create`) without recounting the table
+    """
+    added = {}
+    for name in names:
+        added[name or ''] = added.get(name or '', 0) + 1
+
+    for name, count in added.items():
+        Category.objects.get_or_create(kind=kind, name=name)
+        Category.objects.filter(kind=kind, name=name).update(count=F('count') + count, updated_at=timezone.now())
+    if added:
+        invalidate(CATEGORIES)
@@ -1,15 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated
+
 from core.perplexity import Perplexity
-from pydantic import BaseModel
+from core.scoring import score_research_papers
+from core.verdicts import find_verdict, store_verdict
+from pydantic import BaseModel, BeforeValidator, TypeAdapter, ValidationError
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 from rest_framework import response as rest_response
 
 
-class Influencer(BaseModel):
+# Answer items are TypedDicts rather than models: validated answers are then plain dicts, ready to
+# be used and stored as JSON without a dump step (see `core.answers.parse_answer`).
+
+def unknown_followers(value):
+    """
+    Keep an influencer whose follower count is not a number (e.g. "1.2M"), without the count
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Influencer(TypedDict):
     name: str
-    bio: str
-    category: str
-    followers: int
-    profile_picture: str
+    bio: NotRequired[str | None]
+    category: NotRequired[str | None]
+    followers: NotRequired[Annotated[int | None, BeforeValidator(unknown_followers)]]
+    profile_picture: NotRequired[str | None]
+
+
+def bounded_map(func, items, concurrency):
+    """
+    Apply func to the items, up to `concurrency` at a time, keeping their order
+    """
+    if concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as executor:
+        return list(executor.map(func, items))
 
 
 class Flow:
@@ -57,7 +86,7 @@ class InfluencerFlow(Flow):
         """
         Discover an influencer
         """
-        response = self.perplexity.ask(self.payload)
+        response = self.perplexity.ask(self.payload, answer_format=self.AnswerFormat)
         return response
 
     class AnswerFormat(BaseModel):
@@ -66,7 +95,7 @@ class InfluencerFlow(Flow):
 
 class InfluencersFlow(Flow):
     """
-    Manages the interaction flow to retrieve influencers
+    Manages the interaction flow to retrieve influencers, other than the ones named in `do_not_repeat` (a list)
     """
 
     def __init__(self, key, model="sonar", count=5, do_not_repeat=None):
@@ -99,22 +128,20 @@ class InfluencersFlow(Flow):
         """
         Discover new influencers
         """
-        response = self.perplexity.ask(self.payload)
+        response = self.perplexity.ask(self.payload, answer_format=self.AnswerFormat)
         return response
 
     class AnswerFormat(BaseModel):
         influencers: list[Influencer]
 
 
-class HealthClaim(BaseModel):
+class HealthClaim(TypedDict):
     claim: str
-    link: str
-    category: str
-    evidence: list[str]
-    counter_evidence: list[str]
-    date: datetime
-    trust_score: float
-    status: str
+    source: NotRequired[str | None]
+    category: NotRequired[str | None]
+    evidence: NotRequired[list[str]]
+    counter_evidence: NotRequired[list[str]]
+    date: NotRequired[str | None]
 
 
 class HealthClaimsFlow(Flow):
@@ -122,7 +149,7 @@ class HealthClaimsFlow(Flow):
     Manages the interaction flow to retrieve health claims for an influencer
     """
 
-    def __init__(self, key, influencer, journals=None, comment=None, count=5, model="sonar", timeframe="latest"):
+    def __init__(self, key, influencer, journals=None, comment=None, count=5, model="sonar", timeframe="latest", concurrency=1, claim_timeout=None, on_event=None, batch_size=1):
         super().__init__(key)
         self.model = model
         self.influencer = influencer
@@ -130,6 +157,10 @@ class HealthClaimsFlow(Flow):
         self.comment = comment
         self.count = count
         self.timeframe = timeframe
+        self.concurrency = concurrency
+        self.claim_timeout = claim_timeout
+        self.on_event = on_event
+        self.batch_size = batch_size
         self.payload = {
             "model": f"{self.model}",
             "messages": [
@@ -156,18 +187,87 @@ class HealthClaimsFlow(Flow):
         """
         Discover health claims for an influencer
         """
-        response = self.perplexity.ask(self.payload)
+        response = self.retrieve_health_claims()
         if isinstance(response, rest_response.Response):
             return response
-        health_claims = [self.validate_claim(claim) for claim in response]
+        health_claims = self.validate_claims(response)
         return health_claims
 
-    def validate_claim(self, claim):
+    def retrieve_health_claims(self):
         """
-        Validate or invalidate the claim based on research papers
+        Retrieve the (not yet validated) health claims of the influencer
         """
-        research_flow = ResearchPapersFlow(self.perplexity.API_KEY, claim['claim'], self.journals)
-        validation_result = research_flow.validate_claim()
+        response = self.perplexity.ask(self.payload, answer_format=self.AnswerFormat)
+        if not isinstance(response, rest_response.Response):
+            # every claim costs research requests: keep to the number asked for (see `core.recheck.recheck_cost`)
+            if str(self.count).isdigit():
+                response = response[:int(self.count)]
+            self.emit('claims_found', {'claims': [claim.get('claim') for claim in response]})
+        return response
+
+    def emit(self, event, data):
+        """
+        Report progress to the `on_event(event, data)` callback, if any (called from worker threads)
+        """
+        if self.on_event:
+            self.on_event(event, data)
+
+    def validate_claims(self, claims, verdicts=None):
+        """
+        Validate the claims, fanning out up to `concurrency` research requests at a time, each
+        covering up to `batch_size` claims.
+        Results keep the input order; claims whose research failed or timed out are dropped.
+
+        Args:
+            claims: claims as retrieved by `retrieve_health_claims`
+            verdicts: claim index -> validation result of claims validated before (e.g. by an
+                interrupted run), reused instead of researched again
+        """
+        claims = list(claims)
+        verdicts = dict(verdicts or {})
+        pending = [(index, claim['claim']) for index, claim in enumerate(claims) if index not in verdicts]
+        size = max(self.batch_size, 1)
+        batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+        for batch, results in zip(batches, self.map(self.research_claims, batches)):
+            for (index, claim), result in zip(batch, results):
+                verdicts[index] = result
+
+        results = [self.apply_validation(claim, verdicts[index]) for index, claim in enumerate(claims)]
+        health_claims = [claim for claim in results if not isinstance(claim, rest_response.Response)]
+        if results and not health_claims:
+            return results[0]
+        return health_claims
+
+    def map(self, func, items):
+        """
+        Apply func to the items, up to `concurrency` at a time, keeping their order
+        """
+        return bounded_map(func, items, self.concurrency)
+
+    def research_claims(self, batch):
+        """
+        Validate or invalidate a batch of (index, claim text) with one research request (one per
+        claim if the batch has a single claim) and report each outcome as soon as it is known
+        """
+        claims = [claim for index, claim in batch]
+        if len(claims) > 1:
+            results = BatchResearchPapersFlow(self.perplexity.API_KEY, claims, self.journals, timeout=self.claim_timeout, concurrency=self.concurrency).validate_claims()
+        else:
+            results = [ResearchPapersFlow(self.perplexity.API_KEY, claim, self.journals, timeout=self.claim_timeout).validate_claim() for claim in claims]
+
+        for (index, claim), result in zip(batch, results):
+            if isinstance(result, rest_response.Response):
+                self.emit('claim_failed', {'index': index, 'claim': claim, 'error': result.data.get('error')})
+            else:
+                self.emit('claim_validated', {'index': index, 'claim': claim, 'trust_score': result.get('trust_score'), 'status': result.get('status'), 'verdict': result})
+        return results
+
+    def apply_validation(self, claim, validation_result):
+        """
+        Merge the validation result into the claim, or return the error response
+        """
+        if isinstance(validation_result, rest_response.Response):
+            return validation_result
         claim.update(validation_result)
         return claim
 
@@ -175,11 +275,11 @@ class HealthClaimsFlow(Flow):
         health_claims: list[HealthClaim]
 
 
-class ResearchPaper(BaseModel):
-    title: str
+class ResearchPaper(TypedDict):
+    title: NotRequired[str | None]
     link: str
-    journal: str
-    date: datetime
+    journal: NotRequired[str | None]
+    date: NotRequired[str | None]
     is_evidence: bool
 
 
@@ -188,10 +288,12 @@ class ResearchPapersFlow(Flow):
     Manages the interaction flow to retrieve research papers and validate/invalidate a claim
     """
 
-    def __init__(self, key, claim, journals=None, model="sonar"):
+    def __init__(self, key, claim, journals=None, model="sonar", timeout=None, reuse_verdict=True):
         super().__init__(key)
         self.model = model
         self.claim = claim
+        self.timeout = timeout
+        self.reuse_verdict = reuse_verdict
         self.journals = journals or ["any", "Pubmed Central", "Nature", "Science", "Cell", "The Lancet", "New England Journal of Medicine", "JAMA"]
         self.payload = {
             "model": f"{self.model}",
@@ -216,49 +318,158 @@ class ResearchPapersFlow(Flow):
         """
         Retrieve research papers for the claim
         """
-        response = self.perplexity.ask(self.payload)
+        response = self.perplexity.ask(self.payload, timeout=self.timeout, answer_format=self.AnswerFormat)
         return response
 
     def validate_claim(self):
         """
-        Validate or invalidate the claim based on research papers
+        Validate or invalidate the claim based on research papers, reusing the fresh verdict of the
+        same or a near-identical claim if there is one
         """
+        if self.reuse_verdict:
+            verdict = find_verdict(self.claim, self.journals)
+            if verdict is not None:
+                return {"claim": self.claim, **verdict}
+
         research_papers = self.retrieve_research_papers()
-        evidence_links = [paper['link'] for paper in research_papers if paper['is_evidence']]
-        counter_evidence_links = [paper['link'] for paper in research_papers if not paper['is_evidence']]
+        if isinstance(research_papers, rest_response.Response):
+            return research_papers
+        verdict = self.evaluate(research_papers)
+        store_verdict(self.claim, self.journals, verdict)
+        return {"claim": self.claim, **verdict}
+
+    @staticmethod
+    def evaluate(research_papers):
+        """
+        Score a claim from its research papers (see `core.scoring`)
+        """
+        return {
+            **score_research_papers(research_papers),
+            "evidence": [paper['link'] for paper in research_papers if paper['is_evidence']],
+            "counter_evidence": [paper['link'] for paper in research_papers if not paper['is_evidence']],
+            "research_papers": research_papers
+        }
 
-        evidence_count = len(evidence_links)
-        counter_evidence_count = len(counter_evidence_links)
-        total_count = evidence_count + counter_evidence_count
+    class AnswerFormat(BaseModel):
+        research_papers: list[ResearchPaper]
 
-        if total_count == 0:
-            trust_score = 0.5  # Neutral score if there is no evidence or counter-evidence
-        else:
-            trust_score = round(evidence_count / total_count, 2)
 
-        status = self.determine_status(trust_score)
+class ClaimResearchPapers(TypedDict):
+    claim_index: int
+    research_papers: list[ResearchPaper]
+
+
+claim_research_papers = TypeAdapter(ClaimResearchPapers)
+
+
+class BatchResearchPapersFlow(Flow):
+    """
+    Manages the interaction flow to retrieve research papers for several claims with one request.
+    Claims the answer misses or returns without papers are researched one by one, up to
+    `concurrency` at a time.
+    """
+
+    def __init__(self, key, claims, journals=None, model="sonar", timeout=None, reuse_verdict=True, concurrency=1):
+        super().__init__(key)
+        self.model = model
+        self.claims = claims
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.reuse_verdict = reuse_verdict
+        self.journals = journals or ["any", "Pubmed Central", "Nature", "Science", "Cell", "The Lancet", "New England Journal of Medicine", "JAMA"]
+
+    def build_payload(self, claims):
+        """
+        Payload asking for the research papers of the claims, answered per claim index
+        """
+        numbered_claims = " ".join(f"{index}: '{claim}'." for index, claim in claims)
         return {
-            "claim": self.claim,
-            "trust_score": trust_score,
-            "status": status,
-            "evidence": evidence_links,
-            "counter_evidence": counter_evidence_links,
-            "research_papers": research_papers
+            "model": f"{self.model}",
+            "messages": [
+                {"role": "system", "content": "Be precise and concise. Search references thoroughly"},
+                {"role": "user", "content": (
+                    f"Find research papers that validate or invalidate each of the following claims: {numbered_claims}"
+                    "Please output a JSON list with one object per claim with the following keys: "
+                    "claim_index (the number of the claim), research_papers (JSON list of objects with the following keys: "
+                    "title, link, journal, date (yyyy-mm-dd), is_evidence (true if evidence, false if counter-evidence))."
+                    f"Research papers should come from the following trusted scientific journals: {', '.join(self.journals)}."
+                    "Do not include any other text in the response."
+                    "Return a valid raw JSON response."
+                )},
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"schema": self.AnswerFormat.model_json_schema()},
+            },
         }
 
-    def determine_status(self, trust_score):
+    def retrieve_research_papers(self, claims):
         """
-        Determine the status based on the trust score
+        Retrieve the research papers of the (index, claim) pairs
+
+        Returns:
+            dict of claim index -> research papers for the claims answered with well-formed papers,
+            or the error response
         """
-        if trust_score > 0.75:
-            return "verified"
-        elif trust_score < 0.25:
-            return "debunked"
-        else:
-            return "questionable"
+        response = self.perplexity.ask(self.build_payload(claims), timeout=self.timeout)
+        if isinstance(response, rest_response.Response):
+            return response
+        if isinstance(response, dict):
+            response = response.get("claims")
+        if not isinstance(response, list):
+            return {}
+
+        indexes = {index for index, claim in claims}
+        research_papers = {}
+        for item in response:
+            # validated one by one: a malformed claim is researched again, not the whole batch
+            try:
+                item = claim_research_papers.validate_python(item)
+            except ValidationError:
+                continue
+            if item['claim_index'] in indexes and item['research_papers']:
+                research_papers[item['claim_index']] = item['research_papers']
+        return research_papers
+
+    def validate_claims(self):
+        """
+        Validate or invalidate the claims based on research papers
+
+        Returns:
+            one result per claim, in order: the validation result or the error response
+        """
+        results = [None] * len(self.claims)
+        if self.reuse_verdict:
+            for index, claim in enumerate(self.claims):
+                verdict = find_verdict(claim, self.journals)
+                if verdict is not None:
+                    results[index] = {"claim": claim, **verdict}
+
+        pending = [(index, claim) for index, claim in enumerate(self.claims) if results[index] is None]
+        if len(pending) > 1:
+            research_papers = self.retrieve_research_papers(pending)
+            # an unparsable answer is retried per claim, a failed request is not
+            if isinstance(research_papers, rest_response.Response):
+                if research_papers.status_code != 500:
+                    return [result or research_papers for result in results]
+                research_papers = {}
+            for index, claim in pending:
+                if index in research_papers:
+                    verdict = ResearchPapersFlow.evaluate(research_papers[index])
+                    store_verdict(claim, self.journals, verdict)
+                    results[index] = {"claim": claim, **verdict}
+
+        def research_claim(index):
+            research_flow = ResearchPapersFlow(self.perplexity.API_KEY, self.claims[index], self.journals, model=self.model, timeout=self.timeout, reuse_verdict=False)
+            return research_flow.validate_claim()
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        for index, result in zip(missing, bounded_map(research_claim, missing, self.concurrency)):
+            results[index] = result
+        return results
 
     class AnswerFormat(BaseModel):
-        research_papers: list[ResearchPaper]
+        claims: list[ClaimResearchPapers]
 
 
 class SingleClaimFlow(Flow):
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db.models import F
+from rapidfuzz import fuzz, process
+
+from core.models import Influencer, InfluencerAlias
+from core.utils import normalize_name
+
+
+DISCOVERY = settings.INFLUENCER_DISCOVERY
+
+
+class InfluencerIndex:
+    """
+    Normalized names of the known influencers and of their aliases, recognizing an influencer whatever
+    title, credentials, word order or small spelling difference it is named with. Loose enough to
+    confuse two people, so only used to leave candidates out of a discovery.
+    """
+    def __init__(self, names=None):
+        # normalized name -> influencer id, None for a name that is not saved (e.g. excluded by the user)
+        self.names = dict(names or {})
+
+    @classmethod
+    def load(cls):
+        names = dict(InfluencerAlias.objects.values_list('normalized_name', 'influencer_id'))
+        names.update(Influencer.objects.exclude(normalized_name='').values_list('normalized_name', 'id'))
+        return cls(names)
+
+    def match(self, name):
+        """
+        Return the known normalized name the name refers to, or None
+        """
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+        if normalized in self.names:
+            return normalized
+        match = process.extractOne(normalized, self.names.keys(), scorer=fuzz.token_sort_ratio, score_cutoff=DISCOVERY['SIMILARITY'] * 100)
+        return match[0] if match else None
+
+    def add(self, name, influencer_id=None):
+        self.names[normalize_name(name)] = influencer_id
+
+
+def known_names(limit):
+    """
+    Names of the `limit` most followed known influencers
+    """
+    return list(Influencer.objects.order_by(F('followers').desc(nulls_last=True), 'id').values_list('name', flat=True)[:limit])
+
+
+def find_influencer(name):
+    """
+    Return the influencer whose normalized name or alias is exactly the normalized name, or None.
+
+    Fuzzy matches (see `InfluencerIndex`) are only good enough to leave a candidate out of a discovery:
+    "Mark Hyman" and "Mark Human" are as alike as two spellings of one name.
+    """
+    normalized = normalize_name(name)
+    if not normalized:
+        return None
+    return (
+        Influencer.objects.filter(normalized_name=normalized).order_by('id').first()
+        or Influencer.objects.filter(aliases__normalized_name=normalized).first()
+    )
@@ -0,0 +1,145 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from core.models import BulkResearch, SingleResearch, ClaimResearch, ResearchStatus
+from core.research import ResearchFailed, run_bulk_research, run_single_research, run_claim_research
+
+
+logger = logging.getLogger(__name__)
+
+# research model -> function running its job
+RUNNERS = {
+    BulkResearch: run_bulk_research,
+    SingleResearch: run_single_research,
+    ClaimResearch: run_claim_research,
+}
+
+# a running job that has not reported progress for this long is considered abandoned by its worker
+STALE_AFTER = timedelta(minutes=30)
+
+
+def reset_for_queue(research, params, resume=False):
+    """
+    Put a fresh queued run with the given request parameters on the research (not saved).
+    A resumed run keeps the checkpoint of the previous one.
+    """
+    research.params = params
+    if not resume:
+        research.checkpoint = {}
+    research.status = ResearchStatus.QUEUED
+    research.failed = False
+    research.progress = 0
+    research.stage = None
+    research.result = None
+    research.error = None
+    research.queued_at = timezone.now()
+    research.started_at = None
+    research.finished_at = None
+
+
+def enqueue(research, params, resume=False):
+    """
+    Queue the research to be processed by a worker with the given request parameters; with
+    `resume`, the stages checkpointed by the previous run are not redone
+    """
+    reset_for_queue(research, params, resume)
+    research.save()
+    # a new run starts a new progress stream
+    research.events().delete()
+    research.emit('queued')
+    return research
+
+
+async def aenqueue(research, params, resume=False):
+    """
+    Async version of `enqueue`, for the async views
+    """
+    reset_for_queue(research, params, resume)
+    await research.asave()
+    await research.events().adelete()
+    await research.aemit('queued')
+    return research
+
+
+def claim_next():
+    """
+    Atomically take the oldest queued research across all research types, or return None.
+
+    The database is the broker: a job belongs to the worker whose conditional UPDATE moved it
+    from queued to running, so any number of workers can poll the same tables.
+    """
+    while True:
+        candidates = []
+        for model in RUNNERS:
+            job = model.objects.filter(status=ResearchStatus.QUEUED).order_by('queued_at').values_list('pk', 'queued_at').first()
+            if job:
+                candidates.append((job[1], model, job[0]))
+        if not candidates:
+            return None
+
+        queued_at, model, pk = min(candidates, key=lambda candidate: candidate[0])
+        claimed = model.objects.filter(pk=pk, status=ResearchStatus.QUEUED).update(
+            status=ResearchStatus.RUNNING, started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            return model.objects.get(pk=pk)
+        # another worker took it first, try the next one
+
+
+def run_job(research):
+    """
+    Run a claimed research and record its outcome on the row
+    """
+    try:
+        result = RUNNERS[type(research)](research)
+    except ResearchFailed as e:
+        research.fail(str(e))
+    except Exception as e:
+        logger.exception('%s %s failed', type(research).__name__, research.pk)
+        research.fail(f'{type(e).__name__}: {e}')
+    else:
+        research.succeed(result)
+
+
+def requeue_stale():
+    """
+    Put back running jobs whose worker stopped reporting progress (e.g. the process was killed)
+    """
+    threshold = timezone.now() - STALE_AFTER
+    requeued = 0
+    for model in RUNNERS:
+        requeued += model.objects.filter(status=ResearchStatus.RUNNING, updated_at__lt=threshold).update(
+            status=ResearchStatus.QUEUED, started_at=None
+        )
+    return requeued
+
+
+class Worker(threading.Thread):
+    """
+    Polls the queue and runs research jobs until stopped
+    """
+    def __init__(self, stop_event, poll_interval=2.0, name=None):
+        super().__init__(name=name, daemon=True)
+        self.stop_event = stop_event
+        self.poll_interval = poll_interval
+
+    def run(self):
+        while not self.stop_event.is_set():
+            close_old_connections()
+            try:
+                research = claim_next()
+            except Exception:
+                logger.exception('Could not poll the research queue')
+                research = None
+
+            if research is None:
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            logger.info('%s picked up %s %s', self.name, type(research).__name__, research.pk)
+            run_job(research)
+        connections.close_all()
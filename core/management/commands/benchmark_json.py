@@ -0,0 +1,86 @@
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.answers import message_content, parse_answer
+from core.api.parsers import ORJSONParser
+from core.api.renderers import ORJSONRenderer
+from core.flows import HealthClaimsFlow, ResearchPapersFlow
+
+
+def legacy_answer(body):
+    """
+    How Perplexity answers were parsed before `core.answers`
+    """
+    resp = json.loads(body)
+    resp = resp.get("choices")[0].get("message").get("content")
+    resp = resp.replace('```json\n', '').replace('```', '').replace('\n', '').replace('    ', '')
+    return json.loads(resp)
+
+
+def completion(answer):
+    """
+    Chat completion body whose content is the answer as a fenced, indented JSON block
+    """
+    content = f'```json\n{json.dumps(answer, indent=4)}\n```'
+    return json.dumps({'id': 'benchmark', 'model': 'sonar', 'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}]}).encode()
+
+
+class Command(BaseCommand):
+    help = 'Compare the orjson renderer/parser and the LLM answer parser with the paths they replaced'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200, help='Claims per API page and papers per LLM answer')
+        parser.add_argument('--repeat', type=int, default=200, help='Times each operation is run')
+
+    def handle(self, *args, **options):
+        items, repeat = options['items'], options['repeat']
+
+        page = {'next': None, 'previous': None, 'results': [
+            {
+                'id': i, 'claim': f'Benchmark claim number {i} about sleep and recovery', 'source': f'https://example.com/post/{i}',
+                'category': 'Sleep', 'date': '2024-05-01', 'trust_score': 0.75, 'status': 'verified',
+                'influencer': {'id': 1, 'name': 'Benchmark influencer', 'bio': 'Sleep researcher ' * 20, 'category': 'Sleep', 'followers': 100000, 'trust_score': 0.8},
+                'evidence': [{'id': j, 'title': f'Paper {j}', 'link': f'https://pubmed.ncbi.nlm.nih.gov/{j}/', 'journal': 'PubMed', 'date': '2020-01-01'} for j in range(4)],
+                'counter_evidence': [{'id': 9, 'title': 'Paper 9', 'link': 'https://pubmed.ncbi.nlm.nih.gov/9/', 'journal': 'PubMed', 'date': None}],
+            }
+            for i in range(items)
+        ]}
+        rendered = JSONRenderer().render(page)
+        self.compare('render API page', repeat, ('JSONRenderer', lambda: JSONRenderer().render(page)), ('ORJSONRenderer', lambda: ORJSONRenderer().render(page)))
+        self.compare('parse API request', repeat, ('JSONParser', lambda: JSONParser().parse(io.BytesIO(rendered))), ('ORJSONParser', lambda: ORJSONParser().parse(io.BytesIO(rendered))))
+
+        papers = completion({'research_papers': [
+            {'title': f'Paper {i}', 'link': f'https://pubmed.ncbi.nlm.nih.gov/{i}/', 'journal': 'PubMed', 'date': '2021-03-04', 'is_evidence': i % 3 != 0}
+            for i in range(items)
+        ]})
+        self.compare(
+            'parse research papers answer', repeat,
+            ('str.replace + json.loads', lambda: legacy_answer(papers)),
+            ('single pass, no validation', lambda: parse_answer(message_content(papers))),
+            ('single pass, validated', lambda: parse_answer(message_content(papers), ResearchPapersFlow.AnswerFormat)),
+        )
+        claims = completion([
+            {'claim': f'Claim {i}', 'source': 'https://example.com', 'category': 'Sleep', 'evidence': [], 'counter_evidence': [], 'date': '2024-01-01'}
+            for i in range(items)
+        ])
+        self.compare(
+            'parse health claims answer', repeat,
+            ('str.replace + json.loads', lambda: legacy_answer(claims)),
+            ('single pass, validated', lambda: parse_answer(message_content(claims), HealthClaimsFlow.AnswerFormat)),
+        )
+
+    def compare(self, label, repeat, *candidates):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        baseline = None
+        for name, func in candidates:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            baseline = baseline or elapsed
+            self.stdout.write(f'  {name}: {elapsed:.3f} ms ({baseline / elapsed:.1f}x)')
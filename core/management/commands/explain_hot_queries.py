@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Influencer, Claim
+
+
+CATEGORIES = ['Nutrition', 'Sleep', 'Fitness', 'Longevity', 'Mental Health', 'Hormones', 'Gut Health', 'Supplements']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the query plan and timing of the hot influencer/claim lookups. '
+        'Run it before and after migrating the index migrations to compare plans.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic influencers (50 claims each) for the run; rolled back afterwards')
+        parser.add_argument('--repeat', type=int, default=20, help='Times each query is executed for timing')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                self.benchmark(options['repeat'])
+                if options['seed']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        influencers = Influencer.objects.bulk_create([
+            Influencer(name=f'Benchmark influencer {i}', category=random.choice(CATEGORIES), trust_score=random.random())
+            for i in range(count)
+        ], batch_size=1000)
+        Claim.objects.bulk_create([
+            Claim(influencer=influencer, claim=f'Benchmark claim {i}', category=random.choice(CATEGORIES), trust_score=random.random(), date=f'2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}')
+            for influencer in influencers for i in range(50)
+        ], batch_size=1000)
+        self.stdout.write(f'Seeded {count} influencers and {count * 50} claims\n')
+
+    def hot_queries(self):
+        influencer = Influencer.objects.order_by('id').first()
+        name = influencer.name if influencer else ''
+        return {
+            'influencer by name': Influencer.objects.filter(name=name),
+            'influencers by category': Influencer.objects.filter(category__icontains='nutri'),
+            'influencer ranking': Influencer.objects.order_by('-trust_score')[:50],
+            'claims of influencer by date': Claim.objects.filter(influencer=influencer).order_by('date'),
+            'claims of influencer by trust score': Claim.objects.filter(influencer=influencer).order_by('trust_score'),
+            'claims by category': Claim.objects.filter(category__icontains='nutri'),
+            'influencer categories': Influencer.objects.values_list('category', flat=True).distinct(),
+            'claim categories': Claim.objects.values_list('category', flat=True).distinct(),
+        }
+
+    def benchmark(self, repeat):
+        for label, queryset in self.hot_queries().items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: {elapsed:.2f} ms'))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
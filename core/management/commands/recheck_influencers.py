@@ -0,0 +1,45 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.recheck import RECHECK, recheck_cost, schedule_rechecks
+
+
+class Command(BaseCommand):
+    help = 'Queue re-checks of the influencers checked longest ago, within a budget of Perplexity requests per tick'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=RECHECK['BUDGET'], help='Perplexity requests the re-checks queued by a tick may make')
+        parser.add_argument('--min-age', type=int, default=RECHECK['MIN_AGE'], help='Seconds since its last check before an influencer is re-checked')
+        parser.add_argument('--count', type=int, default=RECHECK['COUNT'], help='Claims looked for per influencer')
+        parser.add_argument('--model', default='sonar', help='Perplexity model')
+        parser.add_argument('--loop', action='store_true', help='Keep running a tick every --interval seconds')
+        parser.add_argument('--interval', type=float, default=RECHECK['INTERVAL'], help='Seconds between ticks with --loop')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the current tick...')
+            stop_event.set()
+
+        if options['loop']:
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+        while not stop_event.is_set():
+            close_old_connections()
+            researches = schedule_rechecks(options['budget'], options['min_age'], options['count'], model=options['model'])
+            cost = recheck_cost(options['count'])
+            if cost > options['budget']:
+                self.stderr.write(f'A re-check can make up to {cost} requests, more than the budget of {options["budget"]}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Queued {len(researches)} re-check(s) making at most {len(researches) * cost} of {options["budget"]} requests'
+            ))
+            for research in researches:
+                self.stdout.write(f'  {research.params["influencer"]}: {research.params["timeframe"]}')
+            if not options['loop']:
+                break
+            stop_event.wait(options['interval'])
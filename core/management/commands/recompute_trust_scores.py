@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.persistence import recompute_trust_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trust score of every influencer from its claims in one set-based UPDATE'
+
+    def handle(self, *args, **options):
+        updated = recompute_trust_scores()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed trust scores of {updated} influencer(s)'))
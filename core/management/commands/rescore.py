@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.scoring import rescore
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trust scores and statuses of all claims and influencers with the current scoring settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk UPDATE')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        claims, influencers = rescore(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {claims} claim(s) and {influencers} influencer(s) in {time.perf_counter() - start:.1f}s'
+        ))
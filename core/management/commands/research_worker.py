@@ -0,0 +1,37 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers processing queued bulk, single and claim researches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of jobs processed concurrently')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping workers after their current job...')
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} abandoned research(es)')
+
+        workers = [Worker(stop_event, options['poll_interval'], name=f'research-worker-{i}') for i in range(options['workers'])]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(workers)} research worker(s)"))
+
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1)
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+from core.utils import canonicalize_url
+
+
+def chunks(items, size=500):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def merge_duplicate_papers(apps, schema_editor):
+    """
+    Fill canonical_link and fold papers sharing one into the oldest row, re-pointing their evidence links
+    """
+    ResearchPaper = apps.get_model('core', 'ResearchPaper')
+    Claim = apps.get_model('core', 'Claim')
+
+    keepers = {}
+    duplicates = {}
+    for paper in ResearchPaper.objects.order_by('id').only('id', 'link'):
+        canonical = canonicalize_url(paper.link) if paper.link else None
+        if canonical is None:
+            continue
+        if canonical in keepers:
+            duplicates[paper.id] = keepers[canonical]
+        else:
+            keepers[canonical] = paper.id
+
+    for through in (Claim.evidence.through, Claim.counter_evidence.through):
+        for ids in chunks(duplicates):
+            rows = through.objects.filter(researchpaper_id__in=ids)
+            links = {(claim_id, duplicates[paper_id]) for claim_id, paper_id in rows.values_list('claim_id', 'researchpaper_id')}
+            rows.delete()
+            through.objects.bulk_create([through(claim_id=claim_id, researchpaper_id=paper_id) for claim_id, paper_id in links], ignore_conflicts=True)
+
+    for ids in chunks(duplicates):
+        ResearchPaper.objects.filter(id__in=ids).delete()
+
+    ResearchPaper.objects.bulk_update(
+        [ResearchPaper(id=paper_id, canonical_link=canonical) for canonical, paper_id in keepers.items()],
+        ['canonical_link'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_perplexityresponse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='researchpaper',
+            name='canonical_link',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_papers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_researchpaper_canonical_link'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='researchpaper',
+            name='canonical_link',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.utils import text_signature
+
+
+def index_existing_claims(apps, schema_editor):
+    """
+    Compute the LSH signatures of the claims stored so far
+    """
+    Claim = apps.get_model('core', 'Claim')
+    ClaimSignature = apps.get_model('core', 'ClaimSignature')
+    signatures = []
+    for claim_id, influencer_id, text in Claim.objects.values_list('id', 'influencer_id', 'claim').iterator():
+        signatures.extend(
+            ClaimSignature(claim_id=claim_id, influencer_id=influencer_id, bucket=bucket)
+            for bucket in set(text_signature(text))
+        )
+        if len(signatures) >= 5000:
+            ClaimSignature.objects.bulk_create(signatures)
+            signatures = []
+    ClaimSignature.objects.bulk_create(signatures)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_researchpaper_canonical_link_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('claim', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signatures', to='core.claim')),
+                ('influencer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claim_signatures', to='core.influencer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['influencer', 'bucket'], name='core_claims_influen_ddb0fc_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_claims, migrations.RunPython.noop),
+    ]
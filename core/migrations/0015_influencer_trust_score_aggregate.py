@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:26
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Round
+
+
+def aggregate_trust_scores(apps, schema_editor):
+    """
+    Initialize the running trust score aggregates from the stored claims
+    """
+    Influencer = apps.get_model('core', 'Influencer')
+    Claim = apps.get_model('core', 'Claim')
+    claims = Claim.objects.filter(influencer=OuterRef('pk'), trust_score__isnull=False).order_by().values('influencer')
+    Influencer.objects.update(
+        trust_score_sum=Coalesce(Subquery(claims.annotate(total=Sum('trust_score')).values('total')), 0.0),
+        claim_count=Coalesce(Subquery(claims.annotate(count=Count('id')).values('count')), 0),
+        trust_score=Round(Subquery(claims.annotate(average=Avg('trust_score')).values('average')), 2),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_claimsignature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencer',
+            name='claim_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='influencer',
+            name='trust_score_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(aggregate_trust_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_influencer_trust_score_aggregate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='influencer',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+# `category__icontains` compiles to UPPER("category"::text) LIKE UPPER(...) on PostgreSQL,
+# so the trigram indexes are built on that expression.
+TRIGRAM_INDEXES = [
+    ('influencer_category_trgm_idx', 'core_influencer'),
+    ('claim_category_trgm_idx', 'core_claim'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table in TRIGRAM_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER(category::text)) gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_influencer_name_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['influencer', 'date'], name='claim_influencer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['influencer', 'trust_score'], name='claim_influencer_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['category'], name='claim_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['-trust_score'], name='influencer_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['category'], name='influencer_category_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:29
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_catalogue(apps, schema_editor):
+    """
+    Build the category catalogue from the stored influencers and claims
+    """
+    Category = apps.get_model('core', 'Category')
+    for kind, model_name in (('influencer', 'Influencer'), ('claim', 'Claim')):
+        model = apps.get_model('core', model_name)
+        counts = model.objects.order_by().values_list('category').annotate(count=Count('id'))
+        Category.objects.bulk_create([Category(kind=kind, name=name, count=count) for name, count in counts])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('influencer', 'Influencer'), ('claim', 'Claim')], max_length=20)),
+                ('name', models.CharField(blank=True, max_length=255, null=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'name'), name='unique_category')],
+            },
+        ),
+        migrations.RunPython(fill_catalogue, migrations.RunPython.noop),
+    ]
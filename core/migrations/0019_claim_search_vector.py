@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:31
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Index the stored claims: GIN-indexed search vector on PostgreSQL, FTS5 table on SQLite
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE core_claim c SET search_vector = "
+            "setweight(to_tsvector('english', COALESCE(c.claim, '')), 'A') || "
+            "setweight(to_tsvector('english', COALESCE(c.category, '')), 'B') || "
+            "setweight(to_tsvector('english', COALESCE(i.bio, '')), 'C') "
+            "FROM core_influencer i WHERE i.id = c.influencer_id"
+        )
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS claim_search_vector_idx ON core_claim USING gin (search_vector)')
+    elif vendor == 'sqlite':
+        schema_editor.execute('CREATE VIRTUAL TABLE IF NOT EXISTS core_claim_fts USING fts5(claim, category, bio)')
+        schema_editor.execute(
+            "INSERT INTO core_claim_fts (rowid, claim, category, bio) "
+            "SELECT c.id, c.claim, COALESCE(c.category, ''), COALESCE(i.bio, '') "
+            "FROM core_claim c JOIN core_influencer i ON i.id = c.influencer_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS claim_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_claim_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claim',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:34
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_claim_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResearchEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('research_type', models.CharField(choices=[('bulk', 'Bulk'), ('single', 'Single'), ('claim', 'Claim')], max_length=20)),
+                ('research_id', models.PositiveIntegerField()),
+                ('event', models.CharField(max_length=50)),
+                ('data', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['research_type', 'research_id', 'id'], name='research_event_stream_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:36
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_researchevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CanonicalClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('claim', models.TextField()),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('journals', models.CharField(max_length=64)),
+                ('trust_score', models.FloatField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=255, null=True)),
+                ('verdict', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('validated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CanonicalClaimSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('canonical_claim', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signatures', to='core.canonicalclaim')),
+            ],
+        ),
+    ]
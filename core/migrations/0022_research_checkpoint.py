@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:41
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_canonicalclaim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkresearch',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.AddField(
+            model_name='claimresearch',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.AddField(
+            model_name='singleresearch',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
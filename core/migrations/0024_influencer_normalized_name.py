@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.utils import normalize_name
+
+
+def normalize_names(apps, schema_editor):
+    """
+    Fill the normalized name of the existing influencers
+    """
+    Influencer = apps.get_model('core', 'Influencer')
+    influencers = list(Influencer.objects.only('id', 'name'))
+    for influencer in influencers:
+        influencer.normalized_name = normalize_name(influencer.name)
+    Influencer.objects.bulk_update(influencers, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencer',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='InfluencerAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('influencer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='core.influencer')),
+            ],
+        ),
+        migrations.RunPython(normalize_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:49
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+
+
+def last_checks(apps, schema_editor):
+    """
+    Take the last check of the existing influencers from their latest successful research
+    """
+    Influencer = apps.get_model('core', 'Influencer')
+    checked = {}
+    for model, field in (('SingleResearch', 'single_researches'), ('BulkResearch', 'bulk_researches')):
+        latest = Influencer.objects.filter(**{f'{field}__status': 'succeeded'}).annotate(
+            checked_at=Max(Coalesce(f'{field}__started_at', f'{field}__created_at'))
+        ).values_list('id', 'checked_at')
+        for pk, checked_at in latest:
+            if checked_at and (pk not in checked or checked_at > checked[pk]):
+                checked[pk] = checked_at
+    for pk, checked_at in checked.items():
+        Influencer.objects.filter(pk=pk).update(last_checked_at=checked_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_influencer_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencer',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['last_checked_at'], name='influencer_staleness_idx'),
+        ),
+        migrations.RunPython(last_checks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_influencer_last_checked_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['trust_score', 'id'], name='claim_feed_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['date', 'id'], name='claim_feed_date_idx'),
+        ),
+    ]
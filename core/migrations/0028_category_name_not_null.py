@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:12
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def uncategorized(apps, schema_editor):
+    """
+    Replace the (possibly duplicated) NULL categories of each kind by one '' row, recounted
+    """
+    Category = apps.get_model('core', 'Category')
+    sources = {'influencer': apps.get_model('core', 'Influencer'), 'claim': apps.get_model('core', 'Claim')}
+    for kind, model in sources.items():
+        Category.objects.filter(Q(name__isnull=True) | Q(name=''), kind=kind).delete()
+        count = model.objects.filter(Q(category__isnull=True) | Q(category='')).count()
+        if count:
+            Category.objects.create(kind=kind, name='', count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_cacheversion_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(uncategorized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+from core.utils import normalize_name
+
+
+def normalize_aliases(apps, schema_editor):
+    """
+    Recompute the normalized name of the aliases typed in the admin, dropping the later of two
+    aliases that turn out to be the same name
+    """
+    InfluencerAlias = apps.get_model('core', 'InfluencerAlias')
+    aliases = list(InfluencerAlias.objects.order_by('id'))
+    seen = set()
+    for alias in aliases:
+        alias.normalized_name = normalize_name(alias.name)
+        if alias.normalized_name in seen or not alias.normalized_name:
+            alias.delete()
+        else:
+            seen.add(alias.normalized_name)
+    # clear the stored values first so the new ones cannot collide with the old ones
+    kept = [alias for alias in aliases if alias.pk is not None]
+    for alias in kept:
+        InfluencerAlias.objects.filter(pk=alias.pk).update(normalized_name=f'#{alias.pk}')
+    for alias in kept:
+        InfluencerAlias.objects.filter(pk=alias.pk).update(normalized_name=alias.normalized_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_category_name_not_null'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='influenceralias',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+        migrations.RunPython(normalize_aliases, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+from core.utils import normalize_name
 
 
 class AnalysisType(models.TextChoices):
@@ -7,19 +13,109 @@ class AnalysisType(models.TextChoices):
     CLAIM = 'claim'
 
 
+class ResearchStatus(models.TextChoices):
+    PENDING = 'pending'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
 class Research(models.Model):
     analysis_type = models.CharField(max_length=255, choices=AnalysisType.choices, null=True, blank=True)
     failed = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=ResearchStatus.choices, default=ResearchStatus.PENDING, db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    stage = models.CharField(max_length=255, null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    # output of the stages completed so far, which a resumed run does not redo (see `core.research`)
+    checkpoint = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(null=True, blank=True)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'{self.analysis_type} - {self.created_at}'
 
+    def set_progress(self, progress, stage=None):
+        """
+        Record how far the research has come (0-100) and what it is currently doing
+        """
+        self.progress = max(0, min(100, int(progress)))
+        self.stage = stage
+        self.save(update_fields=['progress', 'stage', 'updated_at'])
+        self.emit('progress', {'progress': self.progress, 'stage': stage})
+
+    def emit(self, event, data=None):
+        """
+        Append an event to the research's progress stream (see `core.views.research_events`)
+        """
+        return ResearchEvent.objects.create(research_type=self.analysis_type, research_id=self.pk, event=event, data=data)
+
+    async def aemit(self, event, data=None):
+        """
+        Async version of `emit`
+        """
+        return await ResearchEvent.objects.acreate(research_type=self.analysis_type, research_id=self.pk, event=event, data=data)
+
+    def events(self):
+        """
+        Progress events of the research, oldest first
+        """
+        return ResearchEvent.objects.filter(research_type=self.analysis_type, research_id=self.pk).order_by('id')
+
+    def succeed(self, result=None):
+        """
+        Mark the research as finished successfully, keeping any error recorded for a partial failure
+        """
+        self.status = ResearchStatus.SUCCEEDED
+        self.failed = False
+        self.progress = 100
+        self.stage = None
+        self.result = result
+        self.finished_at = timezone.now()
+        self.save()
+        self.emit('succeeded', {'result': result, 'error': self.error})
+
+    def fail(self, error):
+        """
+        Mark the research as failed
+        """
+        self.status = ResearchStatus.FAILED
+        self.failed = True
+        self.error = error
+        self.finished_at = timezone.now()
+        self.save()
+        self.emit('failed', {'error': error})
+
     class Meta:
         abstract = True
 
 
+class ResearchEvent(models.Model):
+    """
+    Progress event of a running research, streamed to clients as Server-Sent Events.
+    The id orders the events and is the SSE event id clients resume from.
+    """
+    research_type = models.CharField(max_length=20, choices=AnalysisType.choices)
+    research_id = models.PositiveIntegerField()
+    event = models.CharField(max_length=50)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.research_type} {self.research_id} - {self.event}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['research_type', 'research_id', 'id'], name='research_event_stream_idx'),
+        ]
+
+
 class BulkResearch(Research):
     analysis_type = AnalysisType.BULK
     influencers = models.ManyToManyField('Influencer', related_name='bulk_researches', blank=True)
@@ -36,16 +132,53 @@ class ClaimResearch(Research):
 
 
 class Influencer(models.Model):
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, db_index=True)
+    # `core.utils.normalize_name(name)`, kept up to date on save
+    normalized_name = models.CharField(max_length=255, db_index=True, editable=False, default='')
     profile_picture = models.URLField(null=True, blank=True)
     bio = models.TextField(null=True, blank=True)
     category = models.CharField(max_length=255, null=True, blank=True)
     followers = models.IntegerField(null=True, blank=True)
     trust_score = models.FloatField(null=True, blank=True)
+    # running aggregate of the scored claims, so trust_score is updated without reading every claim
+    trust_score_sum = models.FloatField(default=0)
+    claim_count = models.PositiveIntegerField(default=0)
+    # start of the last research that saved its claims; the next re-check only looks for newer claims
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-trust_score'], name='influencer_ranking_idx'),
+            models.Index(fields=['last_checked_at'], name='influencer_staleness_idx'),
+            models.Index(fields=['category'], name='influencer_category_idx'),
+        ]
+
+
+class InfluencerAlias(models.Model):
+    """
+    Another name of an influencer (e.g. a stage name, entered in the admin), resolved like its own name
+    when research results are saved
+    """
+    influencer = models.ForeignKey(Influencer, related_name='aliases', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    # set from `name` on save (`core.signals`)
+    normalized_name = models.CharField(max_length=255, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        # the form cannot check the uniqueness of a field it does not show
+        normalized = normalize_name(self.name)
+        if not normalized:
+            raise ValidationError({'name': 'The alias must contain a name.'})
+        if InfluencerAlias.objects.filter(normalized_name=normalized).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': 'Another alias already has this name.'})
+
 
 class Claim(models.Model):
     influencer = models.ForeignKey(Influencer, related_name='claims', on_delete=models.CASCADE)
@@ -57,16 +190,125 @@ class Claim(models.Model):
     status = models.CharField(max_length=50, null=True, blank=True)
     evidence = models.ManyToManyField('ResearchPaper', related_name='evidence_claims', blank=True)
     counter_evidence = models.ManyToManyField('ResearchPaper', related_name='counter_evidence_claims', blank=True)
+    # weighted claim/category/influencer bio document, maintained by `core.search` (PostgreSQL only)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.claim
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['influencer', 'date'], name='claim_influencer_date_idx'),
+            models.Index(fields=['influencer', 'trust_score'], name='claim_influencer_score_idx'),
+            # keyset pagination of the claims feed (`ClaimCursorPagination`)
+            models.Index(fields=['trust_score', 'id'], name='claim_feed_score_idx'),
+            models.Index(fields=['date', 'id'], name='claim_feed_date_idx'),
+            models.Index(fields=['category'], name='claim_category_idx'),
+        ]
+
+
+class ClaimSignature(models.Model):
+    """
+    LSH bucket of a claim (see `core.utils.text_signature`), indexed to find similar claims of an influencer
+    """
+    claim = models.ForeignKey(Claim, related_name='signatures', on_delete=models.CASCADE)
+    influencer = models.ForeignKey(Influencer, related_name='claim_signatures', on_delete=models.CASCADE)
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['influencer', 'bucket']),
+        ]
+
 
 class ResearchPaper(models.Model):
     title = models.CharField(max_length=255)
     link = models.URLField()
+    # `core.utils.canonicalize_url(link)`: one row per paper however often it is cited
+    canonical_link = models.CharField(max_length=255, unique=True, null=True, blank=True)
     journal = models.CharField(max_length=255, null=True, blank=True)
     date = models.DateField(null=True, blank=True)
 
     def __str__(self):
         return self.title
+
+
+class CategoryKind(models.TextChoices):
+    INFLUENCER = 'influencer'
+    CLAIM = 'claim'
+
+
+class Category(models.Model):
+    """
+    Catalogue of the categories in use by influencers or claims, maintained by `core.catalogue`
+    """
+    kind = models.CharField(max_length=20, choices=CategoryKind.choices)
+    # '' for the rows without a category: NULLs would not conflict under `unique_category`
+    name = models.CharField(max_length=255, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.kind} - {self.name}'
+
+    class Meta:
+        verbose_name_plural = 'categories'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'name'], name='unique_category'),
+        ]
+
+
+class PerplexityResponse(models.Model):
+    """
+    Cached answer of the Perplexity API, addressed by the hash of its normalized payload
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=255, null=True, blank=True)
+    response = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'{self.model} - {self.key}'
+
+
+class CanonicalClaim(models.Model):
+    """
+    Verdict computed for a claim, reused for the same or a near-identical claim of any influencer
+    while it is fresh (see `core.verdicts`)
+    """
+    claim = models.TextField()
+    # sha256 of the normalized claim text and the journals it was researched in
+    key = models.CharField(max_length=64, unique=True)
+    journals = models.CharField(max_length=64)
+    trust_score = models.FloatField(null=True, blank=True)
+    status = models.CharField(max_length=255, null=True, blank=True)
+    verdict = models.JSONField(encoder=DjangoJSONEncoder)
+    hits = models.PositiveIntegerField(default=0)
+    validated_at = models.DateTimeField(default=timezone.now, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.claim
+
+
+class CanonicalClaimSignature(models.Model):
+    """
+    LSH bucket of a canonical claim (see `core.utils.text_signature`), to find near-identical claims
+    """
+    canonical_claim = models.ForeignKey(CanonicalClaim, related_name='signatures', on_delete=models.CASCADE)
+    bucket = models.BigIntegerField(db_index=True)
+
+
+class CacheVersion(models.Model):
+    """
+    Version of a group of cached API responses, bumped when their data changes (see `core.api.cache`)
+    """
+    scope = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    # when the version was last bumped, the Last-Modified of the responses of the scope
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.scope} v{self.version}'
@@ -1,32 +1,187 @@
-from json import JSONDecodeError
+import asyncio
+import os
+import threading
 
-import requests
-import json
+import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from rest_framework import response
 
+from core.answers import message_content, parse_answer
+from core.perplexity_cache import get_cache, payload_key
+from core.perplexity_limits import RATE_LIMIT, RETRY_STATUSES, THROTTLE_STATUSES, KeyLimiter, backoff, retry_after
+
+
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+
+# Process-wide connection pool settings. A single HTTP/2 connection multiplexes many
+# concurrent requests, so the pool only needs a handful of sockets.
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 120
+CONNECT_TIMEOUT = 10
+
+
+class PerplexityClient:
+    """
+    Process-wide asyncio client for the Perplexity API.
+
+    Owns a background event loop and a pooled `httpx.AsyncClient` (keep-alive, HTTP/2), so every
+    `Perplexity` instance in the process shares the same connections regardless of the thread or
+    event loop it is called from. Requests beyond `PERPLEXITY_MAX_IN_FLIGHT` wait for a free slot,
+    which gives concurrent researches one global concurrency budget; on top of it each API key has
+    its own rate and adaptive concurrency limits (see `core.perplexity_limits`).
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="perplexity-client", daemon=True)
+        self.thread.start()
+        self.client = None
+        self.budget = None
+        self.limiters = {}
+
+    @classmethod
+    def get(cls):
+        """
+        Return the client of the current process, creating it on first use (and after a fork)
+        """
+        with cls._lock:
+            if cls._instance is None or cls._instance.pid != os.getpid():
+                cls._instance = cls()
+            return cls._instance
+
+    def http(self):
+        """
+        Return the pooled HTTP client; must be called from the client loop
+        """
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT),
+            )
+        return self.client
+
+    def slot(self):
+        """
+        Return the semaphore bounding in-flight requests; must be called from the client loop
+        """
+        if self.budget is None:
+            self.budget = asyncio.Semaphore(settings.PERPLEXITY_MAX_IN_FLIGHT)
+        return self.budget
+
+    def limiter(self, key):
+        """
+        Return the limits of the API key; must be called from the client loop
+        """
+        if key not in self.limiters:
+            self.limiters[key] = KeyLimiter()
+        return self.limiters[key]
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the client loop and return a `concurrent.futures.Future`
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
 
 class Perplexity:
     """
     Perplexity class to interact with the Perplexity API
     """
     def __init__(self, key):
-        self.url = "https://api.perplexity.ai/chat/completions"
+        self.url = PERPLEXITY_URL
         self.API_KEY = key
         self.headers = {"Authorization": f"Bearer {self.API_KEY}"}
 
-    def ask(self, payload):
+    async def aask(self, payload, timeout=None, cache=True, answer_format=None):
+        """
+        Ask a question to the Perplexity API from any event loop
+
+        Args:
+            payload: chat completion payload
+            timeout: seconds to wait for the API before giving up (None waits indefinitely)
+            cache: serve and store the answer through the response cache (see `PERPLEXITY_CACHE`)
+            answer_format: pydantic model the answer is validated against (see `core.answers.parse_answer`)
+        """
+        response_cache = get_cache() if cache else None
+        if response_cache:
+            key = payload_key(payload)
+            cached = await sync_to_async(response_cache.get)(key)
+            if cached is not None:
+                return cached
+
+        client = PerplexityClient.get()
+        resp = await asyncio.wrap_future(client.submit(self._ask(client, payload, timeout, answer_format)))
+
+        if response_cache and not isinstance(resp, response.Response):
+            await sync_to_async(response_cache.set)(key, payload, resp)
+        return resp
+
+    def ask(self, payload, timeout=None, cache=True, answer_format=None):
+        """
+        Blocking version of `aask`, for the flows running in worker threads
         """
-        Ask a question to the Perplexity API
+        return async_to_sync(self.aask)(payload, timeout=timeout, cache=cache, answer_format=answer_format)
+
+    async def _ask(self, client, payload, timeout, answer_format=None):
+        """
+        Send the request over the shared connection pool and parse the answer; runs on the client loop
         """
         try:
-            resp = requests.post(self.url, headers=self.headers, json=payload, verify=False)
-            resp = resp.json()
-            resp = resp.get("choices")[0].get("message").get("content")
-            resp = resp.replace('```json\n', '').replace('```', '').replace('\n', '').replace('    ', '')
-            resp = json.loads(resp)
-        except JSONDecodeError:
-            resp = response.Response(data={"error": "Invalid response from Perplexity API"}, status=500)
-        except TypeError:
+            resp = await asyncio.wait_for(self._post(client, payload), timeout=timeout)
+            if resp.status_code == 429:
+                return response.Response(data={"error": "Perplexity API rate limit exceeded"}, status=429)
+            if resp.status_code >= 400:
+                return response.Response(data={"error": f"Perplexity API returned HTTP {resp.status_code}"}, status=502)
+            resp = parse_answer(message_content(resp.content), answer_format)
+        except (ValueError, TypeError, KeyError, IndexError):
+            # not JSON, not a chat completion, or not the expected answer format
             resp = response.Response(data={"error": "Invalid response from Perplexity API"}, status=500)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            resp = response.Response(data={"error": "Perplexity API request timed out"}, status=504)
+        except httpx.TransportError:
+            resp = response.Response(data={"error": "Could not reach Perplexity API"}, status=502)
+
+        return resp
+
+    async def _post(self, client, payload):
+        """
+        Post the payload within the key's limits, retrying throttled, failed and unreachable requests
+        with backoff (honouring Retry-After); returns the last response
+        """
+        limiter = client.limiter(self.API_KEY)
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            # only a throttling answer shrinks the concurrency: a timeout, cancellation or transport
+            # error says nothing about the provider's limits
+            throttled = False
+            try:
+                async with client.slot():
+                    resp = await client.http().post(self.url, headers=self.headers, json=payload)
+                throttled = resp.status_code in THROTTLE_STATUSES
+            except httpx.TransportError:
+                if attempt >= RATE_LIMIT['RETRIES']:
+                    raise
+                resp = None
+            finally:
+                limiter.release(throttled)
+
+            if resp is not None and (resp.status_code not in RETRY_STATUSES or attempt >= RATE_LIMIT['RETRIES']):
+                return resp
 
-        return resp
\ No newline at end of file
+            delay = (retry_after(resp) if resp is not None else None) or backoff(attempt)
+            if resp is not None and resp.status_code == 429:
+                # hold back every request of the key, not just this one
+                limiter.bucket.pause(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import PerplexityResponse
+
+
+def normalize_payload(payload):
+    """
+    Reduce a chat completion payload to the parts that determine the answer, with whitespace normalized
+    """
+    return {
+        "model": payload.get("model"),
+        "messages": [
+            {"role": message.get("role"), "content": re.sub(r"\s+", " ", message.get("content") or "").strip()}
+            for message in payload.get("messages", [])
+        ],
+        "response_format": payload.get("response_format"),
+    }
+
+
+def payload_key(payload):
+    """
+    Content address of a payload: sha256 of its normalized, canonically serialized form
+    """
+    normalized = json.dumps(normalize_payload(payload), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class DatabaseCache:
+    """
+    Stores answers in the `PerplexityResponse` table
+    """
+    def __init__(self, ttl, max_entries, **kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, key):
+        entry = PerplexityResponse.objects.filter(key=key).values_list("pk", "response", "created_at").first()
+        if entry is None:
+            return None
+        pk, response, created_at = entry
+        if created_at < timezone.now() - timedelta(seconds=self.ttl):
+            PerplexityResponse.objects.filter(pk=pk).delete()
+            return None
+        PerplexityResponse.objects.filter(pk=pk).update(accessed_at=timezone.now(), hits=F("hits") + 1)
+        return response
+
+    def set(self, key, payload, response):
+        PerplexityResponse.objects.update_or_create(
+            key=key,
+            defaults={"model": payload.get("model"), "response": response, "created_at": timezone.now(), "accessed_at": timezone.now()},
+        )
+        self.evict()
+
+    def evict(self):
+        """
+        Delete expired entries, then the least recently used ones beyond `max_entries`
+        """
+        PerplexityResponse.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=self.ttl)).delete()
+        overflow = PerplexityResponse.objects.order_by("-accessed_at").values_list("pk", flat=True)[self.max_entries:]
+        overflow = list(overflow)
+        if overflow:
+            PerplexityResponse.objects.filter(pk__in=overflow).delete()
+
+
+class FileCache:
+    """
+    Stores answers as JSON files in a local directory; a file's mtime is its last access time
+    """
+    def __init__(self, ttl, max_entries, location, **kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.location = Path(location)
+
+    def path(self, key):
+        return self.location / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if entry["created_at"] < time.time() - self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return entry["response"]
+
+    def set(self, key, payload, response):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"model": payload.get("model"), "created_at": time.time(), "response": response}, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries beyond `max_entries`; expired entries are dropped when read
+        """
+        entries = []
+        for path in self.location.glob("*/*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(reverse=True)
+        for mtime, path in entries[self.max_entries:]:
+            path.unlink(missing_ok=True)
+
+
+BACKENDS = {
+    "db": DatabaseCache,
+    "file": FileCache,
+}
+
+
+def get_cache():
+    """
+    Return the configured Perplexity response cache, or None if caching is disabled
+    """
+    config = settings.PERPLEXITY_CACHE
+    backend = BACKENDS.get(config.get("BACKEND"))
+    if backend is None:
+        return None
+    return backend(ttl=config["TTL"], max_entries=config["MAX_ENTRIES"], location=config.get("LOCATION"))
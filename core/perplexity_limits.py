@@ -0,0 +1,123 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+
+RATE_LIMIT = settings.PERPLEXITY_RATE_LIMIT
+# answers worth retrying: throttled, or a server error that is likely transient
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second on average, in bursts of up to `capacity`.
+    `pause` holds every request back for a while, e.g. for the Retry-After of a 429, keeping the
+    tokens: the concurrency limit is what shrinks on throttling.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests: grows by about one per `limit` successful requests and halves
+    when the provider throttles (at most once per `cooldown` seconds, so a burst of 429s from
+    requests sent together counts once).
+    """
+    def __init__(self, limit, min_limit=1, max_limit=None, cooldown=1.0):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit or limit
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.decreased_at = 0
+        self.waiters = []
+
+    async def acquire(self):
+        while self.in_flight >= max(self.min_limit, int(self.limit)):
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                self.waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self, throttled):
+        # synchronous so a cancelled request (e.g. timed out) always gives its slot back
+        self.in_flight -= 1
+        if throttled:
+            now = time.monotonic()
+            if now - self.decreased_at >= self.cooldown:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self.decreased_at = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class KeyLimiter:
+    """
+    Rate and concurrency limits of one API key; must be used from the Perplexity client loop
+    """
+    def __init__(self):
+        self.bucket = TokenBucket(RATE_LIMIT['REQUESTS_PER_MINUTE'] / 60, RATE_LIMIT['BURST'])
+        self.concurrency = AdaptiveConcurrency(settings.PERPLEXITY_MAX_IN_FLIGHT)
+
+    async def acquire(self):
+        await self.bucket.acquire()
+        await self.concurrency.acquire()
+
+    def release(self, throttled):
+        self.concurrency.release(throttled)
+
+
+def retry_after(resp):
+    """
+    Seconds to wait according to the Retry-After header of the response (capped), or None
+    """
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - timezone.now()).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), RATE_LIMIT['MAX_BACKOFF'])
+
+
+def backoff(attempt):
+    """
+    Exponential backoff with full jitter for the given retry attempt (0-based)
+    """
+    return random.uniform(0, min(RATE_LIMIT['MAX_BACKOFF'], RATE_LIMIT['BACKOFF'] * 2 ** attempt))
@@ -0,0 +1,206 @@
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from core.api.cache import CATALOG, invalidate
+from core.catalogue import add_categories
+from core.influencers import find_influencer
+from core.models import CategoryKind, Influencer, Claim, ClaimSignature, ResearchPaper
+from core.scoring import influencer_scores
+from core.search import index_claims
+from core.utils import canonicalize_url, find_similar, text_signature
+
+
+def parse_date(date):
+    """
+    Return the date if it is a valid yyyy-mm-dd string, else None
+    """
+    try:
+        # Validate date format
+        if date and date != "Undated":
+            datetime.strptime(date, '%Y-%m-%d')
+        else:
+            date = None
+    except ValueError:
+        date = None
+    return date
+
+
+def save_influencer(influencer):
+    """
+    Get the influencer by name (see `core.influencers.find_influencer`) or create it from the flow data
+    """
+    influencer_obj = find_influencer(influencer.get('name'))
+    if not influencer_obj:
+        influencer_obj = Influencer.objects.create(
+            name=influencer.get('name'),
+            bio=influencer.get('bio'),
+            followers=influencer.get('followers'),
+            profile_picture=influencer.get('profile_picture'),
+            category=influencer.get('category')
+        )
+    return influencer_obj
+
+
+def mark_checked(influencer_obj, checked_at=None):
+    """
+    Record that the claims of the influencer were researched as of `checked_at` (default now),
+    unless a later check is already recorded
+    """
+    checked_at = checked_at or timezone.now()
+    Influencer.objects.filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=checked_at), pk=influencer_obj.pk).update(last_checked_at=checked_at)
+    influencer_obj.last_checked_at = max(influencer_obj.last_checked_at or checked_at, checked_at)
+
+
+@transaction.atomic
+def save_health_claims(influencer_obj, health_claims, deduplicate=True):
+    """
+    Save the health claims of the influencer with their research papers and update its trust score.
+
+    Claims, papers and both evidence link tables are written with one `bulk_create` each inside a
+    single transaction, so the number of queries does not grow with the number of claims or papers.
+    Papers are upserted on their canonical link, so a paper cited again reuses its existing row
+    (only filling in a title or journal it lacks).
+    Duplicates are looked for only among the claims sharing a MinHash bucket with the new claim
+    (`ClaimSignature`), so the check does not scan the influencer's whole claim history.
+
+    Args:
+        influencer_obj: Influencer the claims belong to
+        health_claims: validated claims as returned by the flows
+        deduplicate: skip claims similar to ones the influencer already has
+
+    Returns:
+        the created Claim objects
+    """
+    claim_signatures = [set(text_signature(claim.get('claim'))) for claim in health_claims]
+
+    # bucket -> texts of the influencer's claims in it, looked up in the signature index in one query
+    bucket_claims = defaultdict(list)
+    if deduplicate and claim_signatures:
+        buckets = set().union(*claim_signatures)
+        for bucket, text in ClaimSignature.objects.filter(influencer=influencer_obj, bucket__in=buckets).values_list('bucket', 'claim__claim'):
+            bucket_claims[bucket].append(text)
+
+    new_claims = []
+    for claim, signature in zip(health_claims, claim_signatures):
+        # Check for duplicate claims among the candidates sharing a bucket (Levenshtein ratio)
+        if deduplicate:
+            candidates = list({text for bucket in signature for text in bucket_claims[bucket]})
+            if candidates and find_similar(claim.get('claim'), candidates):
+                continue
+            for bucket in signature:
+                bucket_claims[bucket].append(claim.get('claim'))
+
+        claim['date'] = parse_date(claim.get('date'))
+        new_claims.append((claim, signature))
+
+    claim_objs = Claim.objects.bulk_create([
+        Claim(influencer=influencer_obj, claim=claim.get('claim'), source=claim.get('source'), category=claim.get('category'), date=claim.get('date'), trust_score=claim.get('trust_score'), status=claim.get('status'))
+        for claim, signature in new_claims
+    ])
+    add_categories(CategoryKind.CLAIM, [claim.get('category') for claim, signature in new_claims])
+    index_claims([claim_obj.id for claim_obj in claim_objs])
+    ClaimSignature.objects.bulk_create([
+        ClaimSignature(claim_id=claim_obj.id, influencer=influencer_obj, bucket=bucket)
+        for claim_obj, (claim, signature) in zip(claim_objs, new_claims)
+        for bucket in signature
+    ])
+
+    # one row per paper: upsert on the canonical link, then map links to the shared rows
+    papers = {}
+    evidence_links = set()
+    counter_evidence_links = set()
+    for claim_obj, (claim, signature) in zip(claim_objs, new_claims):
+        for paper in claim.get('research_papers') or []:
+            canonical_link = canonicalize_url(paper.get('link') or '')
+            if not canonical_link:
+                continue
+            papers[canonical_link] = ResearchPaper(title=paper.get('title') or '', link=paper.get('link'), canonical_link=canonical_link, journal=paper.get('journal'), date=parse_date(paper.get('date')))
+            if paper.get('is_evidence'):
+                evidence_links.add((claim_obj.id, canonical_link))
+            else:
+                counter_evidence_links.add((claim_obj.id, canonical_link))
+
+    paper_ids = {}
+    if papers:
+        # rows locked in one order by every transaction, so concurrent saves of shared papers cannot deadlock
+        ResearchPaper.objects.bulk_create([papers[link] for link in sorted(papers)], ignore_conflicts=True)
+        stored = ResearchPaper.objects.filter(canonical_link__in=papers).order_by('canonical_link').values_list('canonical_link', 'id', 'title', 'journal')
+        for canonical_link, paper_id, title, journal in stored:
+            paper_ids[canonical_link] = paper_id
+            # a citation without a title or journal never blanks the stored one, but fills in a missing one
+            paper = papers[canonical_link]
+            backfill = {}
+            if not title and paper.title:
+                backfill['title'] = paper.title
+            if not journal and paper.journal:
+                backfill['journal'] = paper.journal
+            if backfill:
+                ResearchPaper.objects.filter(pk=paper_id).update(**backfill)
+
+    Claim.evidence.through.objects.bulk_create([
+        Claim.evidence.through(claim_id=claim_id, researchpaper_id=paper_ids[canonical_link])
+        for claim_id, canonical_link in evidence_links
+    ], ignore_conflicts=True)
+    Claim.counter_evidence.through.objects.bulk_create([
+        Claim.counter_evidence.through(claim_id=claim_id, researchpaper_id=paper_ids[canonical_link])
+        for claim_id, canonical_link in counter_evidence_links
+    ], ignore_conflicts=True)
+
+    # Update influencer trust score from the running aggregate, in the same transaction
+    scores = [claim_obj.trust_score for claim_obj in claim_objs if claim_obj.trust_score is not None]
+    if scores:
+        adjust_trust_score(influencer_obj.pk, sum(scores), len(scores))
+        influencer_obj.refresh_from_db(fields=['trust_score', 'trust_score_sum', 'claim_count'])
+
+    # bulk inserts and updates send no signals
+    invalidate(CATALOG)
+    return claim_objs
+
+
+def adjust_trust_score(influencer_id, score_sum, count):
+    """
+    Add `count` claim scores summing to `score_sum` to the running trust score aggregate of the
+    influencer (negative values take them out), in one UPDATE
+    """
+    emptied = Q(claim_count__lte=-count)
+    total = F('trust_score_sum') + score_sum
+    claims = F('claim_count') + count
+    Influencer.objects.filter(pk=influencer_id).update(
+        trust_score_sum=Case(When(emptied, then=Value(0.0)), default=total),
+        claim_count=Case(When(emptied, then=Value(0)), default=claims),
+        trust_score=Case(When(emptied, then=Value(None)), default=Round(influencer_scores(total, claims), 2), output_field=FloatField()),
+    )
+
+
+def trust_score_aggregates(claim_model):
+    """
+    Update expressions computing an influencer's trust score aggregates from its claims
+    """
+    claims = claim_model.objects.filter(influencer=OuterRef('pk'), trust_score__isnull=False).order_by().values('influencer')
+    return {
+        'trust_score_sum': Coalesce(Subquery(claims.annotate(total=Sum('trust_score')).values('total')), 0.0),
+        'claim_count': Coalesce(Subquery(claims.annotate(count=Count('id')).values('count')), 0),
+        # NULL without scored claims
+        'trust_score': Round(influencer_scores(
+            Subquery(claims.annotate(total=Sum('trust_score')).values('total')),
+            Subquery(claims.annotate(count=Count('id')).values('count')),
+        ), 2),
+    }
+
+
+def recompute_trust_scores(queryset=None):
+    """
+    Recompute the trust score of the influencers (all by default) from their claims in one UPDATE
+
+    Returns:
+        the number of influencers updated
+    """
+    queryset = Influencer.objects.all() if queryset is None else queryset
+    updated = queryset.update(**trust_score_aggregates(Claim))
+    invalidate(CATALOG)
+    return updated
@@ -0,0 +1,81 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from core.jobs import enqueue
+from core.models import Influencer, ResearchStatus, SingleResearch
+from core.perplexity_limits import RATE_LIMIT
+
+
+RECHECK = settings.INFLUENCER_RECHECK
+CLAIM_BATCH_SIZE = settings.PERPLEXITY_CLAIM_BATCH_SIZE
+
+
+def recheck_cost(count):
+    """
+    Most Perplexity requests a re-check of `count` claims can make: one for the claims, one per batch of
+    claims researched plus one per claim of a batch whose answer is redone claim by claim (see
+    `BatchResearchPapersFlow`), each sent up to `1 + RETRIES` times when throttled or failing
+    """
+    size = max(CLAIM_BATCH_SIZE, 1)
+    research = count if size == 1 else math.ceil(count / size) + count
+    return (1 + research) * (1 + RATE_LIMIT['RETRIES'])
+
+
+def recheck_timeframe(last_checked_at):
+    """
+    Timeframe of the claims a re-check looks for: the ones made since the last check
+    """
+    if last_checked_at is None:
+        return 'latest'
+    return f'since {timezone.localtime(last_checked_at):%Y-%m-%d}'
+
+
+def stale_influencers(min_age, retry_after=None):
+    """
+    Influencers not checked for `min_age` seconds, stalest (never checked) first, without a re-check
+    already queued or running, nor one that failed in the last `retry_after` seconds (a failed re-check
+    leaves the influencer the stalest, it would otherwise take the budget of every tick)
+    """
+    retry_after = RECHECK['RETRY_AFTER'] if retry_after is None else retry_after
+    now = timezone.now()
+    return (
+        Influencer.objects
+        .filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=now - timedelta(seconds=min_age)))
+        # holds the claims checked on their own, it has no claims of its own to look for
+        .exclude(name='Default')
+        .exclude(single_researches__status__in=[ResearchStatus.QUEUED, ResearchStatus.RUNNING])
+        .exclude(Exists(SingleResearch.objects.filter(
+            influencer=OuterRef('pk'), status=ResearchStatus.FAILED, finished_at__gte=now - timedelta(seconds=retry_after),
+        )))
+        .order_by(F('last_checked_at').asc(nulls_first=True), 'id')
+    )
+
+
+def schedule_rechecks(budget=None, min_age=None, count=None, **params):
+    """
+    Queue a single research re-checking each of the stalest influencers, as many as `budget` Perplexity
+    requests pay for. Extra `params` (key, model, journals...) are passed to the researches.
+
+    Returns:
+        the queued researches
+    """
+    budget = RECHECK['BUDGET'] if budget is None else budget
+    min_age = RECHECK['MIN_AGE'] if min_age is None else min_age
+    count = count or RECHECK['COUNT']
+
+    researches = []
+    for influencer in stale_influencers(min_age)[:budget // recheck_cost(count)]:
+        research = SingleResearch.objects.create(influencer=influencer)
+        enqueue(research, {
+            **params,
+            'influencer': influencer.name,
+            'influencer_id': influencer.id,
+            'count': count,
+            'timeframe': recheck_timeframe(influencer.last_checked_at),
+        })
+        researches.append(research)
+    return researches
@@ -0,0 +1,323 @@
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import response
+
+from core.flows import InfluencerFlow, InfluencersFlow, HealthClaimsFlow, SingleClaimFlow
+from core.influencers import DISCOVERY, InfluencerIndex, known_names
+from core.models import Influencer
+from core.persistence import mark_checked, parse_date, save_influencer, save_health_claims
+
+
+DEFAULT_PERPLEXITY_KEY = settings.PERPLEXITY_API_KEY
+CLAIM_CONCURRENCY = settings.PERPLEXITY_CLAIM_CONCURRENCY
+CLAIM_TIMEOUT = settings.PERPLEXITY_CLAIM_TIMEOUT
+CLAIM_BATCH_SIZE = settings.PERPLEXITY_CLAIM_BATCH_SIZE
+BULK_INFLUENCER_CONCURRENCY = settings.BULK_INFLUENCER_CONCURRENCY
+
+
+class ResearchFailed(Exception):
+    """
+    Raised when a research stage gets an error response from the Perplexity API
+    """
+    def __init__(self, resp):
+        self.response = resp
+        error = resp.data.get('error') if isinstance(resp.data, dict) else None
+        super().__init__(error or 'Research failed')
+
+
+def check_response(resp):
+    """
+    Raise `ResearchFailed` if a flow returned an error response instead of data
+    """
+    if isinstance(resp, response.Response):
+        raise ResearchFailed(resp)
+    return resp
+
+
+class Checkpoint:
+    """
+    Output of the completed stages of a research run, saved on the research row as each stage
+    completes, so a resumed run (`jobs.enqueue(research, params, resume=True)`) does not redo them.
+
+    Layout: `influencers` (bulk discovery) or `influencer` (single lookup), then per influencer
+    (keyed by its position in the discovery): `claims` (retrieved claims), `verdicts` (claim index
+    -> validation result) and `saved` (the influencer's result once persisted); `verdict` for a
+    claim research.
+    """
+    def __init__(self, research):
+        self.research = research
+        self.lock = threading.Lock()
+
+    def get(self, *path, default=None):
+        value = self.research.checkpoint
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def set(self, *path, value):
+        # several influencer threads update the same row
+        with self.lock:
+            node = self.research.checkpoint
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+            self.research.save(update_fields=['checkpoint', 'updated_at'])
+
+
+def influencer_events(research, checkpoint, name, node):
+    """
+    `HealthClaimsFlow` event callback recording the flow's progress on the research, tagged with
+    the influencer, and checkpointing each verdict
+    """
+    def on_event(event, data):
+        if event == 'claim_validated':
+            checkpoint.set('verdicts', node, str(data['index']), value=data['verdict'])
+        research.emit(event, {'influencer': name, **data})
+    return on_event
+
+
+def research_health_claims(checkpoint, health_flow, node):
+    """
+    Retrieve and validate the claims of an influencer, reusing the claims and verdicts checkpointed under `node`
+    """
+    claims = checkpoint.get('claims', node)
+    if claims is None:
+        claims = check_response(health_flow.retrieve_health_claims())
+        checkpoint.set('claims', node, value=claims)
+    verdicts = {int(index): verdict for index, verdict in checkpoint.get('verdicts', node, default={}).items()}
+    # validation updates the claims in place, keep the checkpointed ones as retrieved
+    return check_response(health_flow.validate_claims(copy.deepcopy(claims), verdicts))
+
+
+def discover_new_influencers(research, key, model, count, do_not_repeat):
+    """
+    Discover up to `count` influencers that are neither known nor in `do_not_repeat` (comma-separated
+    names), so no claim research is spent on an influencer that is already researched.
+
+    Known influencers are named in the prompt (the most followed ones) and filtered out of the answer
+    (see `core.influencers.InfluencerIndex`); the ones that were returned anyway are replaced by re-querying
+    for the missing influencers in small batches.
+    """
+    index = InfluencerIndex.load()
+    excluded = [name.strip() for name in (do_not_repeat or '').split(',') if name.strip()]
+    for name in excluded:
+        index.add(name)
+    known = known_names(DISCOVERY['EXCLUDE'])
+
+    found, skipped = [], []
+    for attempt in range(1 + DISCOVERY['MAX_REQUERIES']):
+        missing = count - len(found)
+        if missing <= 0:
+            break
+        if attempt:
+            missing = min(missing, DISCOVERY['REQUERY_BATCH'])
+            research.set_progress(0, f'Discovering {missing} more influencers')
+        # names returned by this run first: they are the likeliest to be returned again
+        names = excluded + [influencer['name'] for influencer in found] + skipped
+        flow = InfluencersFlow(key, model=model, count=missing, do_not_repeat=names + [name for name in known if name not in names])
+        resp = check_response(flow.discover_influencers())
+        if not resp:
+            break
+
+        repeated = []
+        for influencer in resp:
+            name = influencer.get('name')
+            match = index.match(name)
+            if match is None:
+                index.add(name)
+                found.append(influencer)
+            else:
+                repeated.append(name)
+        if repeated:
+            skipped.extend(repeated)
+            research.emit('influencers_skipped', {'influencers': repeated})
+    return found[:count]
+
+
+def run_bulk_research(research):
+    """
+    Discover influencers, research their health claims and save the results to the research.
+
+    Influencers are researched concurrently (at most `BULK_INFLUENCER_CONCURRENCY` at a time, with
+    all their requests sharing the process-wide Perplexity budget) and each one is saved as soon as
+    its claims are validated. Every stage is checkpointed, so a resumed run only researches the
+    influencers (and claims) that were not finished.
+    """
+    params = research.params
+    key = params.get('key') or DEFAULT_PERPLEXITY_KEY
+    model = params.get('model', 'sonar')
+    journals = params.get('journals')
+    comment = params.get('comment')
+    count = int(params.get('count', 5))
+    do_not_repeat = params.get('do_not_repeat')
+    timeframe = params.get('timeframe', 'latest')
+    checkpoint = Checkpoint(research)
+
+    # retrieve new influencers
+    resp = checkpoint.get('influencers')
+    if resp is None:
+        research.set_progress(0, 'Discovering influencers')
+        resp = discover_new_influencers(research, key, model, count, do_not_repeat)
+        if not resp:
+            return resp
+        checkpoint.set('influencers', value=resp)
+    research.emit('influencers_found', {'influencers': resp})
+
+    def research_influencer(node, influencer):
+        name = influencer.get('name')
+        try:
+            health_flow = HealthClaimsFlow(key, influencer, journals, comment, model=model, timeframe=timeframe, concurrency=CLAIM_CONCURRENCY, claim_timeout=CLAIM_TIMEOUT, batch_size=CLAIM_BATCH_SIZE, on_event=influencer_events(research, checkpoint, name, node))
+            health_resp = research_health_claims(checkpoint, health_flow, node)
+            influencer['health_claims'] = health_resp
+
+            # save influencer to research
+            influencer_obj = save_influencer(influencer)
+            research.influencers.add(influencer_obj)
+            save_health_claims(influencer_obj, health_resp)
+            mark_checked(influencer_obj, research.started_at)
+            influencer['trust_score'] = influencer_obj.trust_score
+            checkpoint.set('saved', node, value=influencer)
+            research.emit('influencer_saved', {'influencer': influencer, 'influencer_id': influencer_obj.id})
+            return influencer
+        except ResearchFailed as e:
+            research.emit('influencer_failed', {'influencer': name, 'error': str(e)})
+            raise
+        finally:
+            connections.close_all()
+
+    # influencers saved by an interrupted run are done
+    pending = {str(index): copy.deepcopy(influencer) for index, influencer in enumerate(resp) if checkpoint.get('saved', str(index)) is None}
+    done = len(resp) - len(pending)
+    research.set_progress(10 + 90 * done / len(resp), f'Researching {len(pending)} influencers')
+    errors = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(BULK_INFLUENCER_CONCURRENCY, len(pending))) as executor:
+            futures = {executor.submit(research_influencer, node, influencer): influencer for node, influencer in pending.items()}
+            for future in as_completed(futures):
+                name = futures[future].get('name')
+                try:
+                    future.result()
+                    done += 1
+                except ResearchFailed as e:
+                    errors.append(f'{name}: {e}')
+                research.set_progress(10 + 90 * (done + len(errors)) / len(resp), f'Saved {done} of {len(resp)} influencers')
+
+    if not done:
+        raise ResearchFailed(response.Response(data={'error': '; '.join(errors)}, status=500))
+    if errors:
+        research.error = f"{len(errors)} of {len(resp)} influencers failed: {'; '.join(errors)}"
+
+    # keep the discovery order in the result
+    saved = checkpoint.get('saved', default={})
+    return [saved[str(index)] for index in range(len(resp)) if str(index) in saved]
+
+
+def run_single_research(research):
+    """
+    Research the health claims of one influencer and save the results to the research.
+    Stages are checkpointed like in `run_bulk_research`.
+    """
+    params = research.params
+    key = params.get('key') or DEFAULT_PERPLEXITY_KEY
+    model = params.get('model', 'sonar')
+    influencer = params.get('influencer')
+    count = params.get('count', 5)
+    journals = params.get('journals')
+    comment = params.get('comment')
+    timeframe = params.get('timeframe', 'latest')
+    checkpoint = Checkpoint(research)
+
+    saved = checkpoint.get('saved', '0')
+    if saved is not None:
+        return saved
+
+    # retrieve influencer
+    resp = checkpoint.get('influencer')
+    if resp is None and params.get('influencer_id'):
+        # re-check of a known influencer (see `core.recheck`): its profile is already saved
+        resp = Influencer.objects.filter(pk=params['influencer_id']).values('name', 'bio', 'category', 'followers', 'profile_picture').first()
+    if resp is None:
+        research.set_progress(0, f'Looking up {influencer}')
+        flow = InfluencerFlow(key, influencer, model=model)
+        resp = check_response(flow.check_influencer())
+        checkpoint.set('influencer', value=resp)
+    resp = copy.deepcopy(resp)
+    research.emit('influencer_found', {'influencer': resp})
+
+    # retrieve health claims
+    research.set_progress(10, f'Researching claims of {influencer}')
+    health_flow = HealthClaimsFlow(key, influencer, journals=journals, comment=comment, count=count, model=model, timeframe=timeframe, concurrency=CLAIM_CONCURRENCY, claim_timeout=CLAIM_TIMEOUT, batch_size=CLAIM_BATCH_SIZE, on_event=influencer_events(research, checkpoint, influencer, '0'))
+    health_resp = research_health_claims(checkpoint, health_flow, '0')
+    resp['health_claims'] = health_resp
+
+    # save influencer to research
+    research.set_progress(90, 'Saving results')
+    influencer_obj = save_influencer(resp)
+    research.influencer = influencer_obj
+    research.save(update_fields=['influencer', 'updated_at'])
+    save_health_claims(influencer_obj, resp.get('health_claims'))
+    mark_checked(influencer_obj, research.started_at)
+    resp['trust_score'] = influencer_obj.trust_score
+    checkpoint.set('saved', '0', value=resp)
+    research.emit('influencer_saved', {'influencer': resp, 'influencer_id': influencer_obj.id})
+
+    return resp
+
+
+def run_claim_research(research):
+    """
+    Validate a single claim and save it to the research, reusing the checkpointed verdict
+    """
+    params = research.params
+    key = params.get('key') or DEFAULT_PERPLEXITY_KEY
+    model = params.get('model', 'sonar')
+    claim = params.get('claim')
+    journals = params.get('journals')
+
+    checkpoint = Checkpoint(research)
+
+    # validate the claim
+    validation_result = copy.deepcopy(checkpoint.get('verdict'))
+    if validation_result is None:
+        research.set_progress(0, 'Validating claim')
+        flow = SingleClaimFlow(key, claim, journals, model=model)
+        validation_result = check_response(flow.validate_claim())
+        checkpoint.set('verdict', value=copy.deepcopy(validation_result))
+    research.emit('claim_validated', {'claim': validation_result.get('claim'), 'trust_score': validation_result.get('trust_score'), 'status': validation_result.get('status')})
+
+    # Save the claim and its papers to the Default influencer
+    research.set_progress(90, 'Saving results')
+    default_influencer, created = Influencer.objects.get_or_create(name="Default")
+    claim_obj, = save_health_claims(default_influencer, [{
+        'claim': validation_result.get('claim'),
+        'category': validation_result.get('category'),
+        'date': datetime.now().strftime('%Y-%m-%d'),
+        'trust_score': validation_result.get('trust_score'),
+        'status': validation_result.get('status'),
+        'research_papers': validation_result.get('research_papers', []),
+    }], deduplicate=False)
+
+    # Update validation_result with serializable research papers
+    validation_result['research_papers'] = [
+        {
+            'title': paper.get('title'),
+            'link': paper.get('link'),
+            'journal': paper.get('journal'),
+            'date': parse_date(paper.get('date'))
+        }
+        for paper in validation_result.get('research_papers', []) if paper.get('link')
+    ]
+
+    # Associate ClaimResearch with the claim
+    research.claim = claim_obj
+    research.save(update_fields=['claim', 'updated_at'])
+    research.emit('claim_saved', {'claim': validation_result, 'claim_id': claim_obj.id})
+
+    return validation_result
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from core.api.cache import CATALOG, invalidate
+from core.models import Claim, Influencer, ResearchPaper
+from core.utils import normalize_text
+
+
+SCORING = settings.TRUST_SCORING
+JOURNAL_WEIGHTS = {normalize_text(journal): weight for journal, weight in SCORING['JOURNAL_WEIGHTS'].items()}
+# a claim scoring above VERIFIED is verified, below DEBUNKED debunked, else questionable
+VERIFIED = 0.75
+DEBUNKED = 0.25
+
+
+def determine_status(trust_score):
+    """
+    Status of a claim with the given trust score
+    """
+    if trust_score > VERIFIED:
+        return "verified"
+    elif trust_score < DEBUNKED:
+        return "debunked"
+    else:
+        return "questionable"
+
+
+def statuses(trust_scores):
+    """
+    `determine_status` of an array of trust scores
+    """
+    return np.select([trust_scores > VERIFIED, trust_scores < DEBUNKED], ['verified', 'debunked'], 'questionable')
+
+
+def paper_weights(journals, dates, today=None):
+    """
+    Weight of each research paper (see `settings.TRUST_SCORING`) from its journal and date (None if undated)
+    """
+    journals = np.array([normalize_text(journal) for journal in journals], dtype=object)
+    names, inverse = np.unique(journals, return_inverse=True)
+    weights = np.array([JOURNAL_WEIGHTS.get(name, SCORING['DEFAULT_JOURNAL_WEIGHT']) for name in names], dtype=float)[inverse]
+
+    half_life = SCORING['RECENCY_HALF_LIFE']
+    if half_life and len(weights):
+        dates = np.array(dates, dtype='datetime64[D]')
+        ages = (np.datetime64(today or date.today(), 'D') - dates).astype(float) / 365.25
+        ages = np.where(np.isnat(dates), half_life, np.maximum(ages, 0))
+        weights = weights * 0.5 ** (ages / half_life)
+    return weights
+
+
+def claim_scores(evidence, counter_evidence):
+    """
+    Trust scores, rounded to 2 decimals, of claims with the given total weights of evidence and of counter-evidence papers
+    """
+    prior_mean, strength = SCORING['PRIOR_MEAN'], SCORING['PRIOR_STRENGTH']
+    numerator = prior_mean * strength + evidence
+    denominator = strength + evidence + counter_evidence
+    scores = np.divide(numerator, denominator, out=np.full(np.shape(numerator), prior_mean, dtype=float), where=denominator > 0)
+    return np.round(scores, 2)
+
+
+def influencer_scores(totals, counts):
+    """
+    Trust scores, rounded to 2 decimals, of influencers with the given sums and counts of claim scores; None
+    where an influencer has no scored claim. Takes arrays or query expressions (for an UPDATE).
+    """
+    strength = SCORING['INFLUENCER_PRIOR_STRENGTH']
+    if not strength:
+        return totals / counts
+    return (SCORING['PRIOR_MEAN'] * strength + totals) / (strength + counts)
+
+
+def paper_date(value):
+    """
+    Date of a yyyy-mm-dd string, None if it is not one
+    """
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def score_research_papers(research_papers):
+    """
+    Trust score and status of a claim from its research papers as returned by the flows
+    """
+    weights = paper_weights([paper.get('journal') for paper in research_papers], [paper_date(paper.get('date')) for paper in research_papers])
+    is_evidence = np.array([bool(paper.get('is_evidence')) for paper in research_papers], dtype=bool)
+    trust_score = float(claim_scores(weights[is_evidence].sum(), weights[~is_evidence].sum()))
+    return {"trust_score": trust_score, "status": determine_status(trust_score)}
+
+
+def link_weights(through, claim_index, paper_index, weights):
+    """
+    Total paper weight per claim over an evidence link table
+    """
+    links = np.array(through.objects.values_list('claim_id', 'researchpaper_id'), dtype=np.int64).reshape(-1, 2)
+    claim_pos = np.searchsorted(claim_index, links[:, 0])
+    paper_pos = np.searchsorted(paper_index, links[:, 1])
+    # links of claims that are not rescored
+    known = (claim_pos < len(claim_index)) & (claim_index[np.minimum(claim_pos, len(claim_index) - 1)] == links[:, 0])
+    return np.bincount(claim_pos[known], weights=weights[paper_pos[known]], minlength=len(claim_index))
+
+
+@transaction.atomic
+def rescore(batch_size=1000):
+    """
+    Recompute the trust score and status of every scored claim from its evidence and counter-evidence
+    papers, then the trust score of every influencer, with array operations over the link tables. Only
+    the rows whose values changed are written.
+
+    Returns:
+        the numbers of claims and of influencers updated
+    """
+    papers = list(ResearchPaper.objects.order_by('id').values_list('id', 'journal', 'date'))
+    paper_index = np.array([paper[0] for paper in papers], dtype=np.int64)
+    weights = paper_weights([paper[1] for paper in papers], [paper[2] for paper in papers])
+
+    claims = list(Claim.objects.filter(trust_score__isnull=False).order_by('id').values_list('id', 'influencer_id', 'trust_score', 'status'))
+    claim_index = np.array([claim[0] for claim in claims], dtype=np.int64)
+    evidence = link_weights(Claim.evidence.through, claim_index, paper_index, weights)
+    counter_evidence = link_weights(Claim.counter_evidence.through, claim_index, paper_index, weights)
+    scores = claim_scores(evidence, counter_evidence)
+    claim_statuses = statuses(scores)
+
+    # scores are rounded, so the changed claims share a few hundred (score, status) values at most: one
+    # UPDATE ... WHERE id IN per value and batch is much cheaper than a CASE per row (`bulk_update`)
+    changed = defaultdict(list)
+    for (claim_id, influencer_id, trust_score, status_before), score, status in zip(claims, scores, claim_statuses):
+        if trust_score != score or status_before != status:
+            changed[float(score), str(status)].append(claim_id)
+    for (score, status), ids in changed.items():
+        for start in range(0, len(ids), batch_size):
+            Claim.objects.filter(id__in=ids[start:start + batch_size]).update(trust_score=score, status=status)
+
+    influencers = list(Influencer.objects.order_by('id').values_list('id', 'trust_score', 'trust_score_sum', 'claim_count'))
+    influencer_index = np.array([influencer[0] for influencer in influencers], dtype=np.int64)
+    owners = np.searchsorted(influencer_index, np.array([claim[1] for claim in claims], dtype=np.int64))
+    totals = np.bincount(owners, weights=scores, minlength=len(influencers))
+    counts = np.bincount(owners, minlength=len(influencers))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        influencer_trust = np.round(influencer_scores(totals, counts), 2)
+
+    updated_influencers = []
+    for (influencer_id, trust_score, trust_score_sum, claim_count), trust, total, count in zip(influencers, influencer_trust, totals, counts):
+        trust = float(trust) if count else None
+        # the running sums drift by rounding errors, not worth a write
+        if trust_score != trust or claim_count != count or abs(trust_score_sum - total) > 1e-6:
+            updated_influencers.append(Influencer(id=influencer_id, trust_score=trust, trust_score_sum=float(total), claim_count=int(count)))
+    Influencer.objects.bulk_update(updated_influencers, ['trust_score', 'trust_score_sum', 'claim_count'], batch_size=batch_size)
+
+    # bulk updates send no signals
+    invalidate(CATALOG)
+    return sum(len(ids) for ids in changed.values()), len(updated_influencers)
@@ -0,0 +1,110 @@
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+from django.utils.html import escape
+
+from core.models import Claim, Influencer
+
+
+# text search configuration of the PostgreSQL search vectors
+SEARCH_CONFIG = 'english'
+# SQLite FTS5 table mirroring the searchable claim text (rowid = claim id)
+FTS_TABLE = 'core_claim_fts'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+# placeholders (private use characters) the database puts around matches, turned into the markup once
+# the claim text is escaped: claims come from LLM answers and social media and may contain HTML
+MATCH_START = '\ue000'
+MATCH_STOP = '\ue001'
+
+
+def index_claims(claim_ids):
+    """
+    (Re)index the claims for full-text search: their text, category and the bio of their influencer
+    """
+    claim_ids = list(claim_ids)
+    if not claim_ids:
+        return
+
+    if connection.vendor == 'postgresql':
+        bio = Subquery(Influencer.objects.filter(pk=OuterRef('influencer_id')).values('bio')[:1])
+        Claim.objects.filter(pk__in=claim_ids).update(search_vector=(
+            SearchVector('claim', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('category', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(bio, weight='C', config=SEARCH_CONFIG)
+        ))
+    elif connection.vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(claim_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', claim_ids)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, claim, category, bio) '
+                f"SELECT c.id, c.claim, COALESCE(c.category, ''), COALESCE(i.bio, '') "
+                f'FROM core_claim c JOIN core_influencer i ON i.id = c.influencer_id WHERE c.id IN ({placeholders})',
+                claim_ids,
+            )
+
+
+def highlight(headline):
+    """
+    HTML of a headline: the text escaped, the matches wrapped in <mark></mark>
+    """
+    return str(escape(headline)).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_STOP, HIGHLIGHT_STOP)
+
+
+def search_claims(query, limit=20):
+    """
+    Full-text search over claims, best match first.
+
+    Uses the GIN-indexed search vector on PostgreSQL and the FTS5 table on SQLite, falling back to a
+    plain substring match elsewhere.
+
+    Returns:
+        Claim objects annotated with `rank` (higher is better) and `headline` (claim text, HTML escaped,
+        with the matched terms wrapped in <mark></mark>)
+    """
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        claims = list(
+            Claim.objects.filter(search_vector=search_query)
+            .annotate(
+                rank=SearchRank(F('search_vector'), search_query),
+                headline=SearchHeadline('claim', search_query, config=SEARCH_CONFIG, start_sel=MATCH_START, stop_sel=MATCH_STOP, highlight_all=True),
+            )
+            .select_related('influencer')
+            .prefetch_related('evidence', 'counter_evidence')
+            .order_by('-rank', 'id')[:limit]
+        )
+        for claim in claims:
+            claim.headline = highlight(claim.headline)
+        return claims
+
+    if connection.vendor == 'sqlite':
+        # quote every term so user input cannot break the FTS5 query syntax; terms are ANDed
+        terms = ' '.join('"{}"'.format(term.replace('"', '""')) for term in re.findall(r'\w+', query))
+        if not terms:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, 10.0, 5.0, 1.0), highlight({FTS_TABLE}, 0, %s, %s) "
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0) LIMIT %s',
+                [MATCH_START, MATCH_STOP, terms, limit],
+            )
+            matches = cursor.fetchall()
+        claims = Claim.objects.select_related('influencer').prefetch_related('evidence', 'counter_evidence').in_bulk([claim_id for claim_id, rank, headline in matches])
+        results = []
+        for claim_id, rank, headline in matches:
+            claim = claims.get(claim_id)
+            if claim is not None:
+                claim.rank = rank
+                claim.headline = highlight(headline)
+                results.append(claim)
+        return results
+
+    claims = list(Claim.objects.filter(claim__icontains=query).select_related('influencer').prefetch_related('evidence', 'counter_evidence').order_by('id')[:limit])
+    for claim in claims:
+        claim.rank = None
+        claim.headline = highlight(claim.claim)
+    return claims
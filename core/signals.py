@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.api.cache import CATALOG, RESEARCH, invalidate
+from core.catalogue import refresh_categories
+from core.models import BulkResearch, SingleResearch, ClaimResearch, CategoryKind, Claim, Influencer, InfluencerAlias, ResearchPaper
+from core.persistence import adjust_trust_score
+from core.search import index_claims
+from core.utils import normalize_name
+
+
+def schedule_refresh(*kinds):
+    """
+    Refresh the category catalogue once the current transaction commits
+    """
+    def refresh():
+        for kind in kinds:
+            refresh_categories(kind)
+    transaction.on_commit(refresh)
+
+
+@receiver(pre_save, sender=Influencer)
+def influencer_normalize_name(sender, instance, **kwargs):
+    instance.normalized_name = normalize_name(instance.name)
+
+
+@receiver(pre_save, sender=InfluencerAlias)
+def alias_normalize_name(sender, instance, **kwargs):
+    instance.normalized_name = normalize_name(instance.name)
+
+
+@receiver(post_save, sender=Influencer)
+def influencer_saved(sender, instance, created, update_fields=None, **kwargs):
+    invalidate(CATALOG)
+    if created or update_fields is None or 'category' in update_fields:
+        schedule_refresh(CategoryKind.INFLUENCER)
+    if not created and (update_fields is None or 'bio' in update_fields):
+        # the bio is part of the search document of its claims
+        transaction.on_commit(lambda: index_claims(instance.claims.values_list('id', flat=True)))
+
+
+@receiver(post_delete, sender=Influencer)
+def influencer_deleted(sender, instance, **kwargs):
+    invalidate(CATALOG)
+    # its claims are deleted with it
+    schedule_refresh(CategoryKind.INFLUENCER, CategoryKind.CLAIM)
+
+
+@receiver(post_save, sender=Claim)
+def claim_saved(sender, instance, **kwargs):
+    invalidate(CATALOG)
+    schedule_refresh(CategoryKind.CLAIM)
+    transaction.on_commit(lambda: index_claims([instance.pk]))
+
+
+@receiver(pre_save, sender=Claim)
+def claim_counted_score(sender, instance, update_fields=None, **kwargs):
+    # the (influencer, score) the aggregates count for the claim, replaced in `claim_rescored`
+    instance._counted_score = None
+    if instance.pk and (update_fields is None or {'trust_score', 'influencer'} & set(update_fields)):
+        instance._counted_score = Claim.objects.filter(pk=instance.pk).values_list('influencer_id', 'trust_score').first()
+
+
+@receiver(post_save, sender=Claim)
+def claim_rescored(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep the running trust score aggregates of the influencers in step with a claim saved outside
+    `save_health_claims` (which bulk creates claims and updates the aggregate itself)
+    """
+    if not created and update_fields is not None and not {'trust_score', 'influencer'} & set(update_fields):
+        return
+    before = getattr(instance, '_counted_score', None)
+    after = (instance.influencer_id, instance.trust_score)
+    if before == after:
+        return
+    if before is not None and before[1] is not None:
+        adjust_trust_score(before[0], -before[1], -1)
+    if instance.trust_score is not None:
+        adjust_trust_score(instance.influencer_id, instance.trust_score, 1)
+
+
+@receiver(post_delete, sender=Claim)
+def claim_deleted(sender, instance, **kwargs):
+    invalidate(CATALOG)
+    schedule_refresh(CategoryKind.CLAIM)
+    if instance.trust_score is not None:
+        adjust_trust_score(instance.influencer_id, -instance.trust_score, -1)
+
+
+@receiver(post_save, sender=ResearchPaper)
+@receiver(post_delete, sender=ResearchPaper)
+@receiver(m2m_changed, sender=Claim.evidence.through)
+@receiver(m2m_changed, sender=Claim.counter_evidence.through)
+def papers_changed(sender, **kwargs):
+    invalidate(CATALOG)
+
+
+@receiver(post_save, sender=BulkResearch)
+@receiver(post_save, sender=SingleResearch)
+@receiver(post_save, sender=ClaimResearch)
+@receiver(post_delete, sender=BulkResearch)
+@receiver(post_delete, sender=SingleResearch)
+@receiver(post_delete, sender=ClaimResearch)
+@receiver(m2m_changed, sender=BulkResearch.influencers.through)
+def research_changed(sender, **kwargs):
+    invalidate(RESEARCH)
@@ -1,3 +1,694 @@
-# from django.test import TestCase
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+
+from django.core.cache import caches
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.answers import parse_answer
+from core.api.cache import CACHE_ALIAS
+from core.influencers import InfluencerIndex, find_influencer
+from core.jobs import RUNNERS, claim_next, enqueue, run_job
+from core.catalogue import add_categories
+from core.flows import BatchResearchPapersFlow, InfluencersFlow, ResearchPapersFlow
+from core.models import CanonicalClaim, Category, CategoryKind, Claim, Influencer, InfluencerAlias, PerplexityResponse, ResearchPaper, ResearchStatus, SingleResearch
+from core.perplexity import Perplexity, PerplexityClient
+from core.perplexity_limits import RATE_LIMIT, AdaptiveConcurrency, TokenBucket
+from core.persistence import save_health_claims, save_influencer
+from core.recheck import recheck_cost, schedule_rechecks, stale_influencers
+from core.research import ResearchFailed
+from core.scoring import SCORING, rescore, score_research_papers
+from core.search import search_claims
+from core.verdicts import find_verdict, store_verdict
+
+
+class JobQueueTests(TestCase):
+    def test_claim_next_takes_the_oldest_queued_job_once(self):
+        first = enqueue(SingleResearch.objects.create(), {'influencer_name': 'A'})
+        second = enqueue(SingleResearch.objects.create(), {'influencer_name': 'B'})
+
+        claimed = claim_next()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, ResearchStatus.RUNNING)
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(claim_next().pk, second.pk)
+        self.assertIsNone(claim_next())
+
+    def test_run_job_records_the_outcome(self):
+        runner = mock.Mock(return_value={'claims': 3})
+        with mock.patch.dict(RUNNERS, {SingleResearch: runner}):
+            enqueue(SingleResearch.objects.create(), {})
+            research = claim_next()
+            run_job(research)
+
+        research.refresh_from_db()
+        self.assertEqual(research.status, ResearchStatus.SUCCEEDED)
+        self.assertEqual(research.result, {'claims': 3})
+        self.assertEqual(research.progress, 100)
+        self.assertEqual(list(research.events().values_list('event', flat=True)), ['queued', 'succeeded'])
+
+    def test_run_job_records_a_failure(self):
+        runner = mock.Mock(side_effect=ResearchFailed(Response(data={'error': 'No claims found'}, status=500)))
+        with mock.patch.dict(RUNNERS, {SingleResearch: runner}):
+            enqueue(SingleResearch.objects.create(), {})
+            research = claim_next()
+            run_job(research)
+
+        research.refresh_from_db()
+        self.assertEqual(research.status, ResearchStatus.FAILED)
+        self.assertTrue(research.failed)
+        self.assertEqual(research.error, 'No claims found')
+
+    def test_resume_keeps_the_checkpoint(self):
+        research = SingleResearch.objects.create(status=ResearchStatus.FAILED, checkpoint={'claims': ['a claim']}, error='timeout')
+
+        enqueue(research, {'influencer_name': 'A'}, resume=True)
+        research.refresh_from_db()
+        self.assertEqual(research.status, ResearchStatus.QUEUED)
+        self.assertEqual(research.checkpoint, {'claims': ['a claim']})
+        self.assertIsNone(research.error)
+
+        enqueue(research, {'influencer_name': 'A'})
+        research.refresh_from_db()
+        self.assertEqual(research.checkpoint, {})
+
+
+class ClaimPaginationTests(TestCase):
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.client = APIClient()
+        influencer = Influencer.objects.create(name='Jane Doe')
+        scores = [0.5, 0.9, None, 0.5, 0.5, None, 0.2, 0.5, 0.9]
+        self.claims = [Claim.objects.create(influencer=influencer, claim=f'claim {i}', trust_score=score) for i, score in enumerate(scores)]
+
+    def walk(self, url):
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([claim['id'] for claim in data['results']])
+            last = data
+            url = data['next']
+        return pages, last
+
+    def test_pages_follow_the_order_without_repeating_tied_claims(self):
+        pages, last = self.walk('/api/v1/claims/?sort_by=-trust_score&page_size=2')
+
+        scored = sorted((claim for claim in self.claims if claim.trust_score is not None), key=lambda claim: (-claim.trust_score, -claim.pk))
+        unscored = sorted((claim for claim in self.claims if claim.trust_score is None), key=lambda claim: -claim.pk)
+        self.assertEqual([pk for page in pages for pk in page], [claim.pk for claim in scored + unscored])
+        self.assertTrue(all(len(page) == 2 for page in pages[:-1]))
+
+        # walking back from the last page gives the same pages
+        url, back = last['previous'], [pages[-1]]
+        while url:
+            data = self.client.get(url).json()
+            back.insert(0, [claim['id'] for claim in data['results']])
+            url = data['previous']
+        self.assertEqual(back, pages)
+
+    def test_ascending_sort_puts_claims_without_a_score_last(self):
+        pages, last = self.walk('/api/v1/claims/?sort_by=trust_score&page_size=4')
+
+        ids = [pk for page in pages for pk in page]
+        scores = [Claim.objects.get(pk=pk).trust_score for pk in ids]
+        self.assertEqual(len(set(ids)), len(self.claims))
+        self.assertEqual(scores, [0.2, 0.5, 0.5, 0.5, 0.5, 0.9, 0.9, None, None])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/v1/claims/?cursor=notacursor').status_code, 404)
+
+
+class CanonicalPaperTests(TestCase):
+    def test_citations_of_one_paper_share_a_row(self):
+        influencer = Influencer.objects.create(name='Jane Doe')
+        health_claims = [
+            {'claim': 'Vitamin D improves sleep', 'trust_score': 0.67, 'status': 'questionable', 'research_papers': [
+                {'title': 'Vitamin D and sleep', 'link': 'https://www.ncbi.nlm.nih.gov/pmc/articles/PMC123/?utm_source=x', 'is_evidence': True},
+            ]},
+            {'claim': 'Cold showers boost immunity', 'trust_score': 0.33, 'status': 'questionable', 'research_papers': [
+                {'title': 'Vitamin D and sleep', 'link': 'http://pmc.ncbi.nlm.nih.gov/articles/PMC123#results', 'is_evidence': False},
+            ]},
+        ]
+
+        first, second = save_health_claims(influencer, health_claims, deduplicate=False)
+        save_health_claims(influencer, [{'claim': 'Magnesium helps sleep', 'research_papers': [
+            {'title': 'Vitamin D and sleep', 'link': 'pmc.ncbi.nlm.nih.gov/articles/PMC123/', 'is_evidence': True},
+        ]}], deduplicate=False)
+
+        paper = ResearchPaper.objects.get()
+        self.assertEqual(paper.canonical_link, 'https://pmc.ncbi.nlm.nih.gov/articles/PMC123')
+        self.assertEqual(list(first.evidence.all()), [paper])
+        self.assertEqual(list(second.counter_evidence.all()), [paper])
+        self.assertEqual(paper.evidence_claims.count(), 2)
+
+    def test_citation_without_a_title_keeps_the_stored_one(self):
+        influencer = Influencer.objects.create(name='Jane Doe')
+        save_health_claims(influencer, [{'claim': 'Vitamin D improves sleep', 'research_papers': [
+            {'title': 'Vitamin D and sleep', 'link': 'https://doi.org/10.1/vd', 'is_evidence': True},
+            {'link': 'https://doi.org/10.1/zinc', 'is_evidence': True},
+        ]}])
+        save_health_claims(influencer, [{'claim': 'Zinc shortens colds', 'research_papers': [
+            {'title': '', 'link': 'https://doi.org/10.1/VD', 'journal': 'Sleep', 'is_evidence': True},
+            {'title': 'Zinc and the common cold', 'link': 'https://doi.org/10.1/zinc', 'is_evidence': True},
+        ]}])
+
+        papers = dict(ResearchPaper.objects.values_list('canonical_link', 'title'))
+        self.assertEqual(papers, {'https://doi.org/10.1/vd': 'Vitamin D and sleep', 'https://doi.org/10.1/zinc': 'Zinc and the common cold'})
+        self.assertEqual(ResearchPaper.objects.get(canonical_link='https://doi.org/10.1/vd').journal, 'Sleep')
+
+
+class ScoringTests(TestCase):
+    def test_share_of_evidence(self):
+        self.assertEqual(score_research_papers([]), {'trust_score': 0.5, 'status': 'questionable'})
+        self.assertEqual(score_research_papers([{'is_evidence': True}]), {'trust_score': 1.0, 'status': 'verified'})
+        self.assertEqual(score_research_papers([{'is_evidence': False}]), {'trust_score': 0.0, 'status': 'debunked'})
+        self.assertEqual(score_research_papers([{'is_evidence': True}] * 2 + [{'is_evidence': False}]), {'trust_score': 0.67, 'status': 'questionable'})
+
+    def test_prior(self):
+        with mock.patch.dict(SCORING, PRIOR_STRENGTH=1):
+            self.assertEqual(score_research_papers([]), {'trust_score': 0.5, 'status': 'questionable'})
+            self.assertEqual(score_research_papers([{'is_evidence': True}]), {'trust_score': 0.75, 'status': 'questionable'})
+            self.assertEqual(score_research_papers([{'is_evidence': True}] * 3), {'trust_score': 0.88, 'status': 'verified'})
+            self.assertEqual(score_research_papers([{'is_evidence': False}] * 2), {'trust_score': 0.17, 'status': 'debunked'})
+
+    def test_rescore(self):
+        influencer = Influencer.objects.create(name='Jane Doe')
+        paper = ResearchPaper.objects.create(title='Vitamin D and sleep', link='https://doi.org/10.1/vd', date=date(2020, 1, 1))
+        supported = Claim.objects.create(influencer=influencer, claim='Vitamin D improves sleep', trust_score=0.5, status='questionable')
+        supported.evidence.add(paper)
+        unsupported = Claim.objects.create(influencer=influencer, claim='Cold showers boost immunity', trust_score=0.0, status='debunked')
+        unscored = Claim.objects.create(influencer=influencer, claim='Not researched yet')
+
+        rescore()
+
+        supported.refresh_from_db()
+        unsupported.refresh_from_db()
+        unscored.refresh_from_db()
+        influencer.refresh_from_db()
+        self.assertEqual((supported.trust_score, supported.status), (1.0, 'verified'))
+        self.assertEqual((unsupported.trust_score, unsupported.status), (0.5, 'questionable'))
+        self.assertIsNone(unscored.trust_score)
+        self.assertEqual(influencer.trust_score, 0.75)
+        self.assertEqual(influencer.claim_count, 2)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.client = APIClient()
+
+    def test_writes_invalidate_cached_responses(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Influencer.objects.create(name='Jane Doe')
+
+        resp = self.client.get('/api/v1/influencers/')
+        etag = resp['ETag']
+        self.assertEqual([influencer['name'] for influencer in resp.json()], ['Jane Doe'])
+        self.assertEqual(self.client.get('/api/v1/influencers/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Influencer.objects.create(name='John Roe')
+
+        resp = self.client.get('/api/v1/influencers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertEqual(len(resp.json()), 2)
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'localhost'])
+    def test_responses_are_cached_per_host(self):
+        influencer = Influencer.objects.create(name='Jane Doe')
+        for i in range(3):
+            Claim.objects.create(influencer=influencer, claim=f'claim {i}')
+
+        first = self.client.get('/api/v1/claims/?page_size=1', HTTP_HOST='api.example.com').json()
+        second = self.client.get('/api/v1/claims/?page_size=1', HTTP_HOST='localhost').json()
+        self.assertTrue(first['next'].startswith('http://api.example.com/'))
+        self.assertTrue(second['next'].startswith('http://localhost/'))
+
+
+class CategoryCatalogueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_removed_category_changes_the_catalogue_etag(self):
+        influencer = Influencer.objects.create(name='Jane Doe')
+        with self.captureOnCommitCallbacks(execute=True):
+            Claim.objects.create(influencer=influencer, claim='Vitamin D improves sleep', category='Sleep')
+            claim = Claim.objects.create(influencer=influencer, claim='Cold showers boost immunity', category='Immunity')
+
+        resp = self.client.get('/api/v1/claims/categories/')
+        etag = resp['ETag']
+        self.assertEqual(resp.json(), ['Immunity', 'Sleep'])
+        self.assertEqual(self.client.get('/api/v1/claims/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            claim.delete()
+
+        resp = self.client.get('/api/v1/claims/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertEqual(resp.json(), ['Sleep'])
+
+    def test_claims_without_a_category_share_one_row(self):
+        add_categories(CategoryKind.CLAIM, [None, 'Sleep', None])
+        add_categories(CategoryKind.CLAIM, [None, ''])
+
+        self.assertEqual(dict(Category.objects.filter(kind=CategoryKind.CLAIM).values_list('name', 'count')), {'': 4, 'Sleep': 1})
+        self.assertEqual(self.client.get('/api/v1/claims/categories/?counts=true').json(), [
+            {'category': None, 'count': 4}, {'category': 'Sleep', 'count': 1},
+        ])
+
+
+class InfluencerAliasTests(TestCase):
+    def setUp(self):
+        self.influencer = Influencer.objects.create(name='Mark Hyman')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_alias_entered_in_the_admin_resolves(self):
+        resp = self.client.post('/admin/core/influenceralias/add/', {'influencer': self.influencer.pk, 'name': 'Dr. Hyman, MD'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(InfluencerAlias.objects.get().normalized_name, 'hyman')
+
+        self.assertEqual(save_influencer({'name': 'Doctor Hyman'}), self.influencer)
+        self.assertEqual(save_influencer({'name': 'dr hyman'}), self.influencer)
+        self.assertEqual(Influencer.objects.count(), 1)
+
+    def test_admin_rejects_a_duplicate_alias(self):
+        InfluencerAlias.objects.create(influencer=self.influencer, name='Dr. Hyman, MD')
+        resp = self.client.post('/admin/core/influenceralias/add/', {'influencer': self.influencer.pk, 'name': 'Doctor Hyman'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(InfluencerAlias.objects.count(), 1)
+
+    def test_discovery_index_knows_aliases(self):
+        InfluencerAlias.objects.create(influencer=self.influencer, name='Dr. Hyman, MD')
+        index = InfluencerIndex.load()
+
+        self.assertEqual(index.match('Doctor Hyman'), 'hyman')
+        self.assertEqual(index.match('Hyman, Mark'), 'mark hyman')
+        self.assertIsNone(index.match('Andrew Huberman'))
+
+    def test_find_influencer_ignores_fuzzy_matches(self):
+        self.assertEqual(find_influencer('Dr. Mark Hyman'), self.influencer)
+        self.assertIsNone(find_influencer('Mark Human'))
+
+
+class ClaimSearchTests(TestCase):
+    def setUp(self):
+        influencer = Influencer.objects.create(name='Jane Doe', bio='Nutritionist writing about zinc')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.zinc = Claim.objects.create(influencer=influencer, claim='<script>alert(1)</script> Zinc cures colds', category='Immunity')
+            self.other = Claim.objects.create(influencer=influencer, claim='Vitamin C prevents colds', category='Immunity')
+
+    def test_headline_escapes_the_claim(self):
+        claim = search_claims('zinc')[0]
+        self.assertEqual(claim, self.zinc)
+        self.assertEqual(claim.headline, '&lt;script&gt;alert(1)&lt;/script&gt; <mark>Zinc</mark> cures colds')
+
+    def test_claim_text_ranks_above_the_bio(self):
+        # both match through the bio of their influencer, one through its text too
+        self.assertEqual([claim.pk for claim in search_claims('zinc')], [self.zinc.pk, self.other.pk])
+        self.assertEqual([claim.pk for claim in search_claims('vitamin colds')], [self.other.pk])
+
+    def test_search_endpoint(self):
+        resp = APIClient().get('/api/v1/claims/search/', {'q': 'vitamin'})
+        self.assertEqual([claim['id'] for claim in resp.json()], [self.other.pk])
+        self.assertEqual(resp.json()[0]['headline'], '<mark>Vitamin</mark> C prevents colds')
+        self.assertEqual(APIClient().get('/api/v1/claims/search/').status_code, 400)
+
+
+def completion(content):
+    return {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+
+
+class PerplexityTestCase(TestCase):
+    """
+    Serves the Perplexity API from `answer` (a request -> httpx.Response function) instead of the network
+    """
+    def setUp(self):
+        self.requests = []
+        client = PerplexityClient.get()
+        self.http, self.limiters = client.client, client.limiters
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        client.limiters = {}
+        self.perplexity = Perplexity('test-key')
+
+    def tearDown(self):
+        client = PerplexityClient.get()
+        client.client, client.limiters = self.http, self.limiters
+
+    def handle(self, request):
+        self.requests.append(json.loads(request.content))
+        return self.answer(request)
+
+    def answer(self, request):
+        return httpx.Response(200, json=completion('{"answer": 42}'))
+
+
+class PerplexityTests(PerplexityTestCase):
+    def test_aask(self):
+        payload = {'model': 'sonar', 'messages': [{'role': 'user', 'content': 'question'}]}
+        self.assertEqual(asyncio.run(self.perplexity.aask(payload, cache=False)), {'answer': 42})
+        self.assertEqual(self.requests, [payload])
+
+    def test_ask_caches_answers(self):
+        payload = {'model': 'sonar', 'messages': [{'role': 'user', 'content': 'question'}]}
+        self.assertEqual(self.perplexity.ask(payload), {'answer': 42})
+        self.assertEqual(self.perplexity.ask({**payload, 'messages': [{'role': 'user', 'content': ' question '}]}), {'answer': 42})
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(PerplexityResponse.objects.get().hits, 1)
+
+    def test_invalid_answer(self):
+        self.answer = lambda request: httpx.Response(200, json=completion('no JSON here'))
+        resp = self.perplexity.ask({'messages': []}, cache=False)
+        self.assertEqual(resp.status_code, 500)
+
+
+class RateLimitTests(PerplexityTestCase):
+    def test_token_bucket_bursts_then_keeps_the_rate(self):
+        async def acquire_all(bucket, count):
+            started = time.monotonic()
+            for i in range(count):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        self.assertLess(asyncio.run(acquire_all(TokenBucket(rate=10, capacity=3), 3)), 0.05)
+        self.assertGreaterEqual(asyncio.run(acquire_all(TokenBucket(rate=10, capacity=3), 5)), 0.15)
+
+    def test_pause_keeps_the_burst(self):
+        async def paused():
+            bucket = TokenBucket(rate=1, capacity=5)
+            bucket.pause(0.1)
+            started = time.monotonic()
+            await bucket.acquire()
+            first = time.monotonic() - started
+            for i in range(4):
+                await bucket.acquire()
+            return first, time.monotonic() - started
+
+        first, total = asyncio.run(paused())
+        self.assertGreaterEqual(first, 0.1)
+        self.assertLess(total, 0.2)
+
+    def test_concurrency_halves_on_throttling_and_grows_back(self):
+        limiter = AdaptiveConcurrency(8, cooldown=60)
+        for throttled in (True, True):
+            limiter.in_flight += 1
+            limiter.release(throttled)
+        # the second 429 came within the cooldown
+        self.assertEqual(limiter.limit, 4)
+
+        for i in range(4):
+            limiter.in_flight += 1
+            limiter.release(False)
+        self.assertEqual(int(limiter.limit), 4)
+        self.assertGreater(limiter.limit, 4.9)
+
+    def test_concurrency_limit_holds_requests_back(self):
+        async def run():
+            limiter = AdaptiveConcurrency(2)
+            running, peak = 0, 0
+
+            async def request():
+                nonlocal running, peak
+                await limiter.acquire()
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                limiter.release(False)
+
+            await asyncio.gather(*[request() for i in range(6)])
+            return peak
+
+        self.assertEqual(asyncio.run(run()), 2)
+
+    @mock.patch.dict(RATE_LIMIT, BACKOFF=0.01)
+    def test_throttled_requests_are_retried(self):
+        statuses = [429, 503, 200]
+        self.answer = lambda request: httpx.Response(statuses.pop(0), headers={'Retry-After': '0'}, json=completion('{"answer": 42}'))
+
+        self.assertEqual(self.perplexity.ask({'messages': []}, cache=False), {'answer': 42})
+        self.assertEqual(len(self.requests), 3)
+        # the two throttled answers came within one cooldown, then one success
+        halved = settings.PERPLEXITY_MAX_IN_FLIGHT / 2
+        self.assertAlmostEqual(PerplexityClient.get().limiters['test-key'].concurrency.limit, halved + 1 / halved)
+
+    @mock.patch.dict(RATE_LIMIT, BACKOFF=0.01, RETRIES=2)
+    def test_retries_are_bounded(self):
+        self.answer = lambda request: httpx.Response(429, headers={'Retry-After': '0'})
+
+        resp = self.perplexity.ask({'messages': []}, cache=False)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(len(self.requests), 3)
+
+    @mock.patch.dict(RATE_LIMIT, BACKOFF=0.01)
+    def test_transport_errors_are_not_throttling(self):
+        failures = [httpx.ConnectError('refused')]
+
+        def answer(request):
+            if failures:
+                raise failures.pop()
+            return httpx.Response(500)
+        self.answer = answer
+
+        resp = self.perplexity.ask({'messages': []}, cache=False)
+        self.assertEqual(resp.status_code, 502)
+        self.assertEqual(PerplexityClient.get().limiters['test-key'].concurrency.limit, settings.PERPLEXITY_MAX_IN_FLIGHT)
+
+
+class RecheckTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.never = Influencer.objects.create(name='Never Checked')
+        self.old = Influencer.objects.create(name='Checked Long Ago', last_checked_at=now - timedelta(days=30))
+        self.older = Influencer.objects.create(name='Checked Longer Ago', last_checked_at=now - timedelta(days=60))
+        self.recent = Influencer.objects.create(name='Checked Recently', last_checked_at=now - timedelta(hours=1))
+        Influencer.objects.create(name='Default')
+
+    def test_stalest_first(self):
+        self.assertEqual(list(stale_influencers(min_age=24 * 60 * 60)), [self.never, self.older, self.old])
+
+    def test_skips_running_and_recently_failed_rechecks(self):
+        enqueue(SingleResearch.objects.create(influencer=self.never), {})
+        SingleResearch.objects.create(influencer=self.older, status=ResearchStatus.FAILED, finished_at=timezone.now() - timedelta(hours=2))
+        SingleResearch.objects.create(influencer=self.old, status=ResearchStatus.FAILED, finished_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(list(stale_influencers(min_age=24 * 60 * 60, retry_after=24 * 60 * 60)), [self.old])
+
+    def test_cost_covers_the_fallback_and_retries(self):
+        with mock.patch('core.recheck.CLAIM_BATCH_SIZE', 5), mock.patch.dict(RATE_LIMIT, RETRIES=3):
+            # claims, 2 batches, 7 claims redone one by one; each request sent up to 4 times
+            self.assertEqual(recheck_cost(7), (1 + 2 + 7) * 4)
+        with mock.patch('core.recheck.CLAIM_BATCH_SIZE', 1), mock.patch.dict(RATE_LIMIT, RETRIES=0):
+            self.assertEqual(recheck_cost(7), 8)
+
+    def test_budget_bounds_the_queued_rechecks(self):
+        cost = recheck_cost(5)
+        researches = schedule_rechecks(budget=2 * cost + cost - 1, min_age=24 * 60 * 60, count=5, model='sonar')
+
+        self.assertEqual([research.influencer for research in researches], [self.never, self.older])
+        self.assertEqual(researches[0].params['timeframe'], 'latest')
+        self.assertTrue(researches[1].params['timeframe'].startswith('since '))
+        self.assertEqual(researches[1].params['influencer_id'], self.older.pk)
+        self.assertEqual(researches[1].status, ResearchStatus.QUEUED)
+        # queued re-checks are not queued again
+        self.assertEqual([research.influencer for research in schedule_rechecks(budget=cost, min_age=24 * 60 * 60, count=5)], [self.old])
+
+
+class ParseAnswerTests(TestCase):
+    def test_wrapped_answer_inside_prose_and_fences(self):
+        content = 'Here you go:\n```json\n{"research_papers": [{"title": "Zinc", "link": "https://doi.org/10.1/z", "is_evidence": true}]}\n```'
+        self.assertEqual(parse_answer(content, ResearchPapersFlow.AnswerFormat), [{'title': 'Zinc', 'link': 'https://doi.org/10.1/z', 'is_evidence': True}])
+
+    def test_bare_list_answer(self):
+        content = '[{"link": "https://doi.org/10.1/z", "is_evidence": false}]'
+        self.assertEqual(parse_answer(content, ResearchPapersFlow.AnswerFormat), [{'link': 'https://doi.org/10.1/z', 'is_evidence': False}])
+
+    def test_line_breaks_inside_strings(self):
+        content = '{"research_papers": [{"title": "Zinc\nand colds", "link": "https://doi.org/10.1/z", "is_evidence": true}]}'
+        self.assertEqual(parse_answer(content, ResearchPapersFlow.AnswerFormat)[0]['title'], 'Zinc and colds')
+
+    def test_lenient_follower_counts(self):
+        content = '{"influencers": [{"name": "Jane Doe", "followers": "1.2M"}, {"name": "John Roe", "followers": "42"}]}'
+        self.assertEqual(parse_answer(content, InfluencersFlow.AnswerFormat), [{'name': 'Jane Doe', 'followers': None}, {'name': 'John Roe', 'followers': 42}])
+
+    def test_invalid_answers(self):
+        for content in ('no JSON at all', '{"research_papers": [{"title": "no link"}]}', '[{"link": "x", "is_evidence": true'):
+            with self.subTest(content=content), self.assertRaises(ValueError):
+                parse_answer(content, ResearchPapersFlow.AnswerFormat)
+
+    def test_without_answer_format(self):
+        self.assertEqual(parse_answer('Answer: {"a": [1, 2.5, null]}'), {'a': [1, 2.5, None]})
+
+
+EVIDENCE = {'title': 'Zinc and colds', 'link': 'https://doi.org/10.1/zinc', 'journal': 'Nature', 'is_evidence': True}
+COUNTER_EVIDENCE = {'title': 'Vitamin C and colds', 'link': 'https://doi.org/10.1/vitc', 'journal': 'Nature', 'is_evidence': False}
+
+
+class BatchResearchTests(PerplexityTestCase):
+    claims = ['Zinc shortens colds', 'Vitamin C prevents colds', 'Fasting improves sleep']
+
+    def answer(self, request):
+        prompt = json.loads(request.content)['messages'][1]['content']
+        if 'each of the following claims' in prompt:
+            # papers for the first claim, none for the second, a malformed item for the third
+            return httpx.Response(200, json=completion(json.dumps({'claims': [
+                {'claim_index': 0, 'research_papers': [EVIDENCE]},
+                {'claim_index': 1, 'research_papers': []},
+                {'claim_index': 2, 'research_papers': [{'title': 'no link'}]},
+            ]})))
+        return httpx.Response(200, json=completion(json.dumps({'research_papers': [COUNTER_EVIDENCE]})))
+
+    def test_claims_missing_from_the_answer_are_researched_one_by_one(self):
+        results = BatchResearchPapersFlow('test-key', self.claims).validate_claims()
+
+        self.assertEqual([(result['claim'], result['trust_score'], result['status']) for result in results], [
+            ('Zinc shortens colds', 1.0, 'verified'),
+            ('Vitamin C prevents colds', 0.0, 'debunked'),
+            ('Fasting improves sleep', 0.0, 'debunked'),
+        ])
+        self.assertEqual(len(self.requests), 3)
+        self.assertIn('Vitamin C prevents colds', self.requests[1]['messages'][1]['content'])
+
+    @mock.patch.dict(RATE_LIMIT, RETRIES=0)
+    def test_failed_batch_request_is_not_retried_per_claim(self):
+        self.answer = lambda request: httpx.Response(404)
+
+        results = BatchResearchPapersFlow('test-key', self.claims).validate_claims()
+        self.assertEqual([result.status_code for result in results], [502, 502, 502])
+        self.assertEqual(len(self.requests), 1)
+
+    def test_fallback_runs_concurrently(self):
+        self.answer = lambda request: httpx.Response(200, json=completion('{"claims": []}'))
+
+        def validate_claim(flow):
+            time.sleep(0.2)
+            return {'claim': flow.claim}
+
+        with mock.patch.object(ResearchPapersFlow, 'validate_claim', validate_claim):
+            started = time.monotonic()
+            results = BatchResearchPapersFlow('test-key', self.claims, reuse_verdict=False, concurrency=3).validate_claims()
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(results, [{'claim': claim} for claim in self.claims])
+
+
+class DuplicateClaimTests(TestCase):
+    def setUp(self):
+        self.influencer = Influencer.objects.create(name='Jane Doe')
+        save_health_claims(self.influencer, [{'claim': 'Intermittent fasting improves insulin sensitivity'}])
+
+    def test_near_identical_claims_are_skipped(self):
+        saved = save_health_claims(self.influencer, [
+            {'claim': 'Intermittent fasting improves insulin sensitivity.'},
+            {'claim': 'Intermittent fasting improves the insulin sensitivity'},
+            {'claim': 'Cold exposure increases brown fat'},
+            {'claim': 'Cold exposure increases brown fat!'},
+        ])
+        self.assertEqual([claim.claim for claim in saved], ['Cold exposure increases brown fat'])
+        self.assertEqual(self.influencer.claims.count(), 2)
+
+    def test_other_influencers_claims_are_not_duplicates(self):
+        other = Influencer.objects.create(name='John Roe')
+        saved = save_health_claims(other, [{'claim': 'Intermittent fasting improves insulin sensitivity'}])
+        self.assertEqual(len(saved), 1)
+
+    def test_deduplication_can_be_skipped(self):
+        saved = save_health_claims(self.influencer, [{'claim': 'Intermittent fasting improves insulin sensitivity'}], deduplicate=False)
+        self.assertEqual(len(saved), 1)
+
+
+JOURNALS = ['Nature', 'Science']
+
+
+class VerdictReuseTests(PerplexityTestCase):
+    def setUp(self):
+        super().setUp()
+        store_verdict('Zinc improves sleep quality', JOURNALS, ResearchPapersFlow.evaluate([EVIDENCE]))
+
+    def test_same_or_near_identical_claim(self):
+        for claim in ('Zinc improves sleep quality', 'zinc improves sleep quality.', 'Zinc improves your sleep quality'):
+            with self.subTest(claim=claim):
+                self.assertEqual(find_verdict(claim, ['science', 'nature'])['trust_score'], 1.0)
+
+    def test_opposite_claim_is_not_reused(self):
+        self.assertIsNone(find_verdict('Zinc worsens sleep quality', JOURNALS))
+        self.assertIsNone(find_verdict('Zinc improves sleep quality', ['Cell']))
+
+    def test_stale_verdict_is_not_reused(self):
+        CanonicalClaim.objects.update(validated_at=timezone.now() - timedelta(days=365))
+        self.assertIsNone(find_verdict('Zinc improves sleep quality', JOURNALS))
+
+    def test_flow_reuses_the_verdict(self):
+        result = ResearchPapersFlow('test-key', 'Zinc improves sleep quality', JOURNALS).validate_claim()
+        self.assertEqual((result['claim'], result['status']), ('Zinc improves sleep quality', 'verified'))
+        self.assertEqual(self.requests, [])
+
+        self.answer = lambda request: httpx.Response(200, json=completion(json.dumps([COUNTER_EVIDENCE])))
+        result = ResearchPapersFlow('test-key', 'Zinc worsens sleep quality', JOURNALS).validate_claim()
+        self.assertEqual(result['status'], 'debunked')
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(CanonicalClaim.objects.count(), 2)
+
+
+@mock.patch('core.research.CLAIM_CONCURRENCY', 1)
+@mock.patch('core.research.CLAIM_BATCH_SIZE', 1)
+@mock.patch.dict(RATE_LIMIT, RETRIES=0)
+class ResumeResearchTests(PerplexityTestCase):
+    def answer(self, request):
+        prompt = json.loads(request.content)['messages'][1]['content']
+        if 'Find information about the influencer' in prompt:
+            return httpx.Response(200, json=completion(json.dumps({'name': 'Jane Doe', 'bio': 'Nutritionist', 'followers': 1000})))
+        if 'health claims for the influencer' in prompt:
+            return httpx.Response(200, json=completion(json.dumps([{'claim': 'Zinc shortens colds'}, {'claim': 'Magnesium improves deep sleep'}])))
+        if 'Magnesium' in prompt and self.papers_down:
+            return httpx.Response(404)
+        return httpx.Response(200, json=completion(json.dumps([EVIDENCE])))
+
+    def test_resumed_run_redoes_only_the_unfinished_stages(self):
+        research = SingleResearch.objects.create()
+        enqueue(research, {'influencer': 'Jane Doe', 'count': 2})
+
+        # the second claim's research fails, then saving the results
+        self.papers_down = True
+        with mock.patch('core.research.save_health_claims', side_effect=RuntimeError('database is gone')):
+            run_job(claim_next())
+        research.refresh_from_db()
+        self.assertEqual(research.status, ResearchStatus.FAILED)
+        self.assertEqual(len(self.requests), 4)
+        self.assertEqual(set(research.checkpoint), {'influencer', 'claims', 'verdicts'})
+
+        self.requests.clear()
+        self.papers_down = False
+        enqueue(research, research.params, resume=True)
+        run_job(claim_next())
+
+        research.refresh_from_db()
+        self.assertEqual(research.status, ResearchStatus.SUCCEEDED)
+        # only the research of the claim that failed is redone
+        self.assertEqual(len(self.requests), 1)
+        self.assertIn('Magnesium improves deep sleep', self.requests[0]['messages'][1]['content'])
+        self.assertEqual(sorted(Influencer.objects.get(name='Jane Doe').claims.values_list('claim', flat=True)), ['Magnesium improves deep sleep', 'Zinc shortens colds'])
+
+    def test_new_run_starts_over(self):
+        research = SingleResearch.objects.create()
+        self.papers_down = False
+        enqueue(research, {'influencer': 'Jane Doe', 'count': 2})
+        run_job(claim_next())
+        self.assertEqual(len(self.requests), 4)
+
+        self.requests.clear()
+        enqueue(research, research.params)
+        self.assertEqual(research.checkpoint, {})
+        with mock.patch('core.perplexity.get_cache', return_value=None):
+            run_job(claim_next())
+        # every stage is redone (the claim verdicts are reused from the verdict cache)
+        self.assertEqual(len(self.requests), 2)
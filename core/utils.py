@@ -1,5 +1,105 @@
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
 import Levenshtein
+from rapidfuzz import fuzz, process
 
 def are_strings_similar(str1, str2, threshold=0.6):
     similarity = Levenshtein.ratio(str1, str2)
     return similarity > threshold
+
+
+# query parameters that only track where a visitor came from
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+def canonicalize_url(url):
+    """
+    Normalize a paper link so every citation of the same paper maps to one string:
+    https scheme, lower-case host without www/default port, no fragment, tracking parameters or
+    trailing slash, sorted query, lower-cased DOIs and the current PubMed / PMC hosts.
+    """
+    url = url.strip()
+    if not url:
+        return None
+    if '://' not in url:
+        url = f'https://{url}'
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f'{host}:{parts.port}'
+
+    path = re.sub(r'/{2,}', '/', parts.path).rstrip('/')
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    ))
+
+    if host in ('dx.doi.org', 'doi.org'):
+        host, path = 'doi.org', path.lower()
+    elif host == 'ncbi.nlm.nih.gov' and path.startswith('/pubmed/'):
+        host, path = 'pubmed.ncbi.nlm.nih.gov', path[len('/pubmed'):]
+    elif host == 'ncbi.nlm.nih.gov' and path.startswith('/pmc/articles/'):
+        host, path = 'pmc.ncbi.nlm.nih.gov', path[len('/pmc'):]
+
+    return urlunsplit(('https', host, path, query, ''))
+
+
+# MinHash LSH over character trigrams: SIGNATURE_BANDS buckets of SIGNATURE_ROWS hashes each.
+# Many narrow bands keep recall high for the loose similarity threshold used for claims.
+SIGNATURE_BANDS = 32
+SIGNATURE_ROWS = 2
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME or 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME)
+    for i in range(SIGNATURE_BANDS * SIGNATURE_ROWS)
+]
+
+def normalize_text(text):
+    """
+    Lower-case the text, drop punctuation and collapse whitespace
+    """
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').lower()).split())
+
+
+# titles and credentials that vary between mentions of the same person
+NAME_AFFIXES = {'dr', 'doctor', 'prof', 'professor', 'mr', 'mrs', 'ms', 'md', 'phd', 'rd', 'dc', 'nd', 'do', 'jr', 'sr'}
+
+def normalize_name(name):
+    """
+    Normalize an influencer name for matching: `normalize_text` without titles and credentials
+    ("Dr. Andrew Huberman, PhD" -> "andrew huberman")
+    """
+    words = normalize_text(name).split()
+    return ' '.join(word for word in words if word not in NAME_AFFIXES) or ' '.join(words)
+
+
+def text_signature(text):
+    """
+    Return the LSH bucket keys of the text: similar texts share at least one bucket with high probability.
+    Keys are signed 64-bit integers so they fit a BigIntegerField.
+    """
+    normalized = normalize_text(text)
+    shingles = {normalized[i:i + 3] for i in range(max(len(normalized) - 2, 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big') for shingle in shingles]
+    minhashes = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+    buckets = []
+    for band in range(SIGNATURE_BANDS):
+        rows = minhashes[band * SIGNATURE_ROWS:(band + 1) * SIGNATURE_ROWS]
+        digest = hashlib.blake2b(repr((band, rows)).encode(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def find_similar(text, candidates, threshold=0.6):
+    """
+    Return the candidate most similar to the text if its Levenshtein ratio exceeds the threshold, else None
+    """
+    match = process.extractOne(text, candidates, scorer=fuzz.ratio, score_cutoff=threshold * 100)
+    if match and match[1] > threshold * 100:
+        return match[0]
+    return None
@@ -0,0 +1,95 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import CanonicalClaim, CanonicalClaimSignature
+from core.scoring import score_research_papers
+from core.utils import find_similar, normalize_text, text_signature
+
+
+VERDICT_CACHE = settings.CLAIM_VERDICT_CACHE
+# words that do not change what a claim states
+STOPWORDS = {'a', 'an', 'the', 'of', 'in', 'on', 'for', 'to', 'and', 'is', 'are', 'be', 'can', 'may', 'it', 'its', 'that', 'this', 'with', 'by', 'at', 'as', 'your', 'you'}
+
+
+def journals_key(journals):
+    """
+    Hash of the journals a claim was researched in, independent of their order and case
+    """
+    return hashlib.sha256('\n'.join(sorted(normalize_text(journal) for journal in journals)).encode()).hexdigest()
+
+
+def claim_key(claim, journals):
+    """
+    Hash of the normalized claim text and its journals, identifying a canonical claim
+    """
+    return hashlib.sha256(f'{normalize_text(claim)}\n{journals_key(journals)}'.encode()).hexdigest()
+
+
+def content_words(text):
+    """
+    Words of the text that carry its meaning, with plural endings dropped
+    """
+    return {word.rstrip('s') for word in normalize_text(text).split() if word not in STOPWORDS}
+
+
+def find_verdict(claim, journals):
+    """
+    Return the fresh verdict of the same claim, else of the most similar claim sharing an LSH bucket
+    and its content words with it, researched in the same journals; None if there is none or reuse
+    is disabled.
+
+    Returns:
+        the verdict dict (trust_score, status, evidence, counter_evidence, research_papers)
+    """
+    max_age = VERDICT_CACHE['MAX_AGE']
+    if not max_age:
+        return None
+
+    fresh = CanonicalClaim.objects.filter(journals=journals_key(journals), validated_at__gte=timezone.now() - timedelta(seconds=max_age))
+    canonical = fresh.filter(key=claim_key(claim, journals)).first()
+    if canonical is None:
+        # near-identical only: a similar claim with different content words ("improves" vs "worsens") may
+        # well have the opposite verdict
+        words = content_words(claim)
+        candidates = {
+            text: pk for text, pk in fresh.filter(signatures__bucket__in=text_signature(claim)).values_list('claim', 'id').distinct()
+            if content_words(text) == words
+        }
+        match = find_similar(claim, list(candidates), VERDICT_CACHE['SIMILARITY']) if candidates else None
+        if match is None:
+            return None
+        canonical = fresh.filter(pk=candidates[match]).first()
+        if canonical is None:
+            return None
+
+    CanonicalClaim.objects.filter(pk=canonical.pk).update(hits=F('hits') + 1)
+    # scored with the current scheme, which may have changed since the verdict was stored
+    return {**canonical.verdict, **score_research_papers(canonical.verdict.get('research_papers') or [])}
+
+
+@transaction.atomic
+def store_verdict(claim, journals, verdict):
+    """
+    Record the verdict computed for the claim, replacing an older one of the same claim
+    """
+    canonical, created = CanonicalClaim.objects.update_or_create(
+        key=claim_key(claim, journals),
+        defaults={
+            'claim': claim,
+            'journals': journals_key(journals),
+            'trust_score': verdict.get('trust_score'),
+            'status': verdict.get('status'),
+            'verdict': verdict,
+            'validated_at': timezone.now(),
+        },
+    )
+    if created:
+        CanonicalClaimSignature.objects.bulk_create([
+            CanonicalClaimSignature(canonical_claim=canonical, bucket=bucket) for bucket in set(text_signature(claim))
+        ])
+    return canonical
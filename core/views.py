@@ -1,3 +1,139 @@
-# from django.shortcuts import render
+import asyncio
+import time
 
-# Create your views here.
+import orjson
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from core.jobs import aenqueue
+from core.models import BulkResearch, SingleResearch, ClaimResearch, ResearchEvent, ResearchStatus
+
+
+POLL_INTERVAL = settings.RESEARCH_EVENTS_POLL_INTERVAL
+KEEPALIVE = settings.RESEARCH_EVENTS_KEEPALIVE
+FINISHED = (ResearchStatus.SUCCEEDED, ResearchStatus.FAILED)
+
+
+def format_event(event):
+    """
+    Serialize a ResearchEvent as a Server-Sent Event
+    """
+    data = orjson.dumps(event.data, default=DjangoJSONEncoder().default).decode()
+    return f'id: {event.id}\nevent: {event.event}\ndata: {data}\n\n'
+
+
+async def stream_events(model, pk, last_event_id):
+    """
+    Yield the events of the research after `last_event_id` as they are written by the worker,
+    until the research has finished and every event was sent
+    """
+    yield f'retry: {int(POLL_INTERVAL * 1000)}\n\n'
+    last_sent = time.monotonic()
+    while True:
+        # read the status first so events written just before the research finished are not missed
+        status = await model.objects.filter(pk=pk).values_list('status', flat=True).afirst()
+        events = ResearchEvent.objects.filter(research_type=model.analysis_type, research_id=pk, id__gt=last_event_id).order_by('id')
+        async for event in events:
+            last_event_id = event.id
+            last_sent = time.monotonic()
+            yield format_event(event)
+
+        if status is None or status in FINISHED:
+            return
+        if time.monotonic() - last_sent >= KEEPALIVE:
+            last_sent = time.monotonic()
+            yield ': keep-alive\n\n'
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def research_events(request, model, pk):
+    """
+    Stream the progress of a research as Server-Sent Events (`text/event-stream`).
+
+    Events: queued, progress, influencers_found, influencer_found, claims_found, claim_validated,
+    claim_failed, influencer_saved, influencer_failed, claim_saved, then succeeded or failed, which
+    ends the stream. Reconnecting clients resume after the `Last-Event-ID` header (or the
+    `last_event_id` query parameter).
+    """
+    if not await model.objects.filter(pk=pk).aexists():
+        raise Http404('Research not found')
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+
+    resp = StreamingHttpResponse(stream_events(model, pk, last_event_id), content_type='text/event-stream')
+    resp['Cache-Control'] = 'no-cache'
+    # tell nginx-like proxies not to buffer the stream
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+async def enqueue_research(model, research_id, params):
+    """
+    Queue the research for the background workers and answer right away with 202
+    """
+    if not research_id:
+        return JsonResponse({'error': 'Research ID is required'}, status=400)
+
+    try:
+        research = await model.objects.aget(id=research_id)
+    except (model.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Research ID is invalid'}, status=400)
+
+    if research.status in (ResearchStatus.QUEUED, ResearchStatus.RUNNING):
+        return JsonResponse({'error': 'Research is already in progress'}, status=409)
+
+    await aenqueue(research, params)
+    return JsonResponse({'research_id': research.id, 'status': research.status}, status=202)
+
+
+# The check endpoints are async views rather than DRF actions (DRF views are sync only), so under
+# ASGI they do not tie up a thread while they wait on the database.
+
+@csrf_exempt
+@require_POST
+async def check_bulk(request):
+    params = {
+        'key': request.GET.get('key'),
+        'model': request.GET.get('model', 'sonar'),
+        'journals': request.GET.get('journals'),
+        'comment': request.GET.get('comment'),
+        'count': request.GET.get('count', 5),
+        'do_not_repeat': request.GET.get('do_not_repeat'),
+        'timeframe': request.GET.get('timeframe', 'latest'),
+    }
+    return await enqueue_research(BulkResearch, request.GET.get('research'), params)
+
+
+@csrf_exempt
+@require_POST
+async def check_influencer(request):
+    params = {
+        'key': request.GET.get('key'),
+        'model': request.GET.get('model', 'sonar'),
+        'influencer': request.GET.get('influencer'),
+        'count': request.GET.get('count', 5),
+        'journals': request.GET.get('journals'),
+        'comment': request.GET.get('comment'),
+        'timeframe': request.GET.get('timeframe', 'latest'),
+    }
+    return await enqueue_research(SingleResearch, request.GET.get('research'), params)
+
+
+@csrf_exempt
+@require_POST
+async def check_claim(request):
+    params = {
+        'key': request.GET.get('key'),
+        'model': request.GET.get('model', 'sonar'),
+        'claim': request.GET.get('claim'),
+        'journals': request.GET.get('journals'),
+    }
+    return await enqueue_research(ClaimResearch, request.GET.get('research'), params)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 import dj_database_url
@@ -35,6 +36,84 @@ ALLOWED_HOSTS = ['veriwell-63c21104cb44.herokuapp.com', 'localhost']
 
 # Perplexity API key
 PERPLEXITY_API_KEY = os.getenv('PERPLEXITY_API_KEY')
+# Max in-flight research requests per influencer and per-claim research timeout (seconds)
+PERPLEXITY_CLAIM_CONCURRENCY = int(os.getenv('PERPLEXITY_CLAIM_CONCURRENCY', 5))
+PERPLEXITY_CLAIM_TIMEOUT = float(os.getenv('PERPLEXITY_CLAIM_TIMEOUT', 120))
+# Claims researched per Perplexity request (1 sends one request per claim)
+PERPLEXITY_CLAIM_BATCH_SIZE = int(os.getenv('PERPLEXITY_CLAIM_BATCH_SIZE', 5))
+# Max Perplexity requests in flight per process, shared by every research running in it
+PERPLEXITY_MAX_IN_FLIGHT = int(os.getenv('PERPLEXITY_MAX_IN_FLIGHT', 10))
+# Per API key limits: requests per minute (token bucket of BURST requests), and retries of throttled
+# (429), failed (5xx) or unreachable requests with exponential backoff of BACKOFF * 2**attempt seconds
+# up to MAX_BACKOFF (or the Retry-After of the answer). In-flight requests of a key adapt (AIMD) between
+# 1 and PERPLEXITY_MAX_IN_FLIGHT to the throttling.
+PERPLEXITY_RATE_LIMIT = {
+    'REQUESTS_PER_MINUTE': float(os.getenv('PERPLEXITY_REQUESTS_PER_MINUTE', 50)),
+    'BURST': int(os.getenv('PERPLEXITY_RATE_LIMIT_BURST', 10)),
+    'RETRIES': int(os.getenv('PERPLEXITY_RETRIES', 3)),
+    'BACKOFF': float(os.getenv('PERPLEXITY_BACKOFF', 1)),
+    'MAX_BACKOFF': float(os.getenv('PERPLEXITY_MAX_BACKOFF', 30)),
+}
+# Max influencers researched at the same time by a bulk research
+BULK_INFLUENCER_CONCURRENCY = int(os.getenv('BULK_INFLUENCER_CONCURRENCY', 5))
+# Cache of Perplexity answers keyed by normalized payload. BACKEND is 'db', 'file' or '' (disabled);
+# entries expire after TTL seconds and the least recently used ones are evicted past MAX_ENTRIES.
+PERPLEXITY_CACHE = {
+    'BACKEND': os.getenv('PERPLEXITY_CACHE_BACKEND', 'db'),
+    'LOCATION': os.getenv('PERPLEXITY_CACHE_LOCATION', BASE_DIR / '.perplexity_cache'),
+    'TTL': int(os.getenv('PERPLEXITY_CACHE_TTL', 7 * 24 * 60 * 60)),
+    'MAX_ENTRIES': int(os.getenv('PERPLEXITY_CACHE_MAX_ENTRIES', 10000)),
+}
+
+# Verdicts of validated claims are reused for the same or a near-identical claim (Levenshtein ratio
+# above SIMILARITY) researched in the same journals for MAX_AGE seconds; a MAX_AGE of 0 disables reuse.
+CLAIM_VERDICT_CACHE = {
+    'MAX_AGE': int(os.getenv('CLAIM_VERDICT_MAX_AGE', 30 * 24 * 60 * 60)),
+    'SIMILARITY': float(os.getenv('CLAIM_VERDICT_SIMILARITY', 0.9)),
+}
+
+# Bulk discovery only researches influencers that are not known yet (same normalized name or alias, or
+# a name at least SIMILARITY alike). The EXCLUDE most followed known influencers are named in the prompt;
+# known influencers it still returns are replaced by re-querying at most MAX_REQUERIES times, asking for
+# at most REQUERY_BATCH influencers each time.
+INFLUENCER_DISCOVERY = {
+    'SIMILARITY': float(os.getenv('INFLUENCER_NAME_SIMILARITY', 0.9)),
+    'EXCLUDE': int(os.getenv('INFLUENCER_DISCOVERY_EXCLUDE', 100)),
+    'REQUERY_BATCH': int(os.getenv('INFLUENCER_DISCOVERY_REQUERY_BATCH', 5)),
+    'MAX_REQUERIES': int(os.getenv('INFLUENCER_DISCOVERY_MAX_REQUERIES', 3)),
+}
+
+# Scheduled re-checks of the known influencers (`manage.py recheck_influencers`). Every INTERVAL seconds
+# a tick spends at most BUDGET Perplexity requests on the influencers checked longest ago, skipping the
+# ones checked less than MIN_AGE seconds ago and the ones whose re-check failed less than RETRY_AFTER
+# seconds ago; each re-check asks for up to COUNT claims made since the last one.
+INFLUENCER_RECHECK = {
+    'BUDGET': int(os.getenv('INFLUENCER_RECHECK_BUDGET', 30)),
+    'INTERVAL': int(os.getenv('INFLUENCER_RECHECK_INTERVAL', 60 * 60)),
+    'MIN_AGE': int(os.getenv('INFLUENCER_RECHECK_MIN_AGE', 7 * 24 * 60 * 60)),
+    'COUNT': int(os.getenv('INFLUENCER_RECHECK_COUNT', 5)),
+    'RETRY_AFTER': int(os.getenv('INFLUENCER_RECHECK_RETRY_AFTER', 24 * 60 * 60)),
+}
+
+# Trust scores (`core.scoring`). Each research paper weighs its journal's weight (JOURNAL_WEIGHTS, by
+# lower-case journal name, else DEFAULT_JOURNAL_WEIGHT), halved every RECENCY_HALF_LIFE years of age
+# (0 disables recency; undated papers count as one half-life old). A claim scores the weighted share of
+# evidence among its papers, smoothed toward PRIOR_MEAN by PRIOR_STRENGTH pseudo-papers; an influencer
+# scores the average of its claims, smoothed by INFLUENCER_PRIOR_STRENGTH pseudo-claims.
+# With the default strengths of 0 a claim scores its share of evidence papers (PRIOR_MEAN without
+# papers), as it always has; run `manage.py rescore` after changing any of these.
+TRUST_SCORING = {
+    'JOURNAL_WEIGHTS': json.loads(os.getenv('TRUST_SCORE_JOURNAL_WEIGHTS', '{}')),
+    'DEFAULT_JOURNAL_WEIGHT': float(os.getenv('TRUST_SCORE_DEFAULT_JOURNAL_WEIGHT', 1)),
+    'RECENCY_HALF_LIFE': float(os.getenv('TRUST_SCORE_RECENCY_HALF_LIFE', 0)),
+    'PRIOR_MEAN': float(os.getenv('TRUST_SCORE_PRIOR_MEAN', 0.5)),
+    'PRIOR_STRENGTH': float(os.getenv('TRUST_SCORE_PRIOR_STRENGTH', 0)),
+    'INFLUENCER_PRIOR_STRENGTH': float(os.getenv('TRUST_SCORE_INFLUENCER_PRIOR_STRENGTH', 0)),
+}
+
+# Seconds between checks for new events of a streamed research, and between SSE keep-alive comments
+RESEARCH_EVENTS_POLL_INTERVAL = float(os.getenv('RESEARCH_EVENTS_POLL_INTERVAL', 1))
+RESEARCH_EVENTS_KEEPALIVE = float(os.getenv('RESEARCH_EVENTS_KEEPALIVE', 15))
 
 ## Database vars
 POSTGRES_DB = os.getenv('POSTGRES_DB')
@@ -74,6 +153,18 @@ CORS_ALLOWED_ORIGINS = [
     "https://veriwell.vercel.app",
 ]
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
 ROOT_URLCONF = 'veriwell_backend.urls'
 
 TEMPLATES = [
@@ -112,6 +203,28 @@ WSGI_APPLICATION = 'veriwell_backend.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
 }
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    # Research workers write from several threads: take the write lock up front and wait for it
+    DATABASES['default'].setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
+
+# Caches. 'api' holds the responses of the read endpoints (see core.api.cache); API_CACHE_BACKEND is
+# 'locmem', 'file' or the dotted path of any Django cache backend (e.g. redis).
+API_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+API_CACHE_BACKEND = os.getenv('API_CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': API_CACHE_BACKENDS.get(API_CACHE_BACKEND, API_CACHE_BACKEND),
+        'LOCATION': os.getenv('API_CACHE_LOCATION', BASE_DIR / '.api_cache' if API_CACHE_BACKEND == 'file' else 'api'),
+        'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', 1000))},
+    },
+}
 
 
 # Password validation
@@ -20,11 +20,19 @@ from django.urls import path, include
 from .routers import DefaultRouter
 
 from core.api.urls import router as core_router
+from core.models import BulkResearch, SingleResearch, ClaimResearch
+from core.views import research_events, check_bulk, check_influencer, check_claim
 
 router = DefaultRouter()
 router.extend(core_router)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/v1/influencers/check_bulk/', check_bulk, name='influencers-check-bulk'),
+    path('api/v1/influencers/check_influencer/', check_influencer, name='influencers-check-influencer'),
+    path('api/v1/influencers/check_claim/', check_claim, name='influencers-check-claim'),
+    path('api/v1/bulk_researches/<int:pk>/events/', research_events, {'model': BulkResearch}, name='bulk_researches-events'),
+    path('api/v1/single_researches/<int:pk>/events/', research_events, {'model': SingleResearch}, name='single_researches-events'),
+    path('api/v1/claim_researches/<int:pk>/events/', research_events, {'model': ClaimResearch}, name='claim_researches-events'),
     path('api/v1/', include(router.urls)),
 ]
\ No newline at end of file